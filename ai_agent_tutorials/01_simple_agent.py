@@ -16,7 +16,11 @@
 """
 
 import os
-from openai import OpenAI
+import sys
+import json
+import hashlib
+import asyncio
+import functools
 from dotenv import load_dotenv
 
 # ==========================================
@@ -24,12 +28,25 @@ from dotenv import load_dotenv
 # ==========================================
 load_dotenv()  # 从 .env 文件加载环境变量
 
-# 创建 OpenAI 客户端
+
+# 懒加载 OpenAI 客户端：import 时不做任何事，第一次真正对话时才
+# 导入 SDK、建立 TLS —— 只看演示（或只跑别的教程文件）不用付这份冷启动开销
 # 如果使用其他兼容 API（DeepSeek、智谱等），修改 base_url
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY", "your-api-key"),
-    base_url=os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1"),
-)
+@functools.cache
+def _get_client():
+    from openai import OpenAI
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY", "your-api-key"),
+        base_url=os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1"),
+    )
+
+
+# LLM 响应的磁盘缓存：temperature=0 时输出是确定的，
+# 重复运行演示脚本可以直接命中缓存，不再重复付 API 延迟和费用
+@functools.cache
+def _get_llm_cache():
+    from diskcache import Cache
+    return Cache('.llm_cache')
 
 # ==========================================
 # 第二步：定义 Agent 类
@@ -40,23 +57,32 @@ class SimpleAgent:
     功能：对话 + 记忆
     """
     
-    def __init__(self, system_prompt: str, model: str = "gpt-3.5-turbo"):
+    def __init__(self, system_prompt: str, model: str = "gpt-3.5-turbo",
+                 temperature: float = 0.7, cache_key: str | None = None):
         """
         初始化 Agent
-        
+
         参数:
             system_prompt: 系统提示词，定义 Agent 的角色和行为
             model: 使用的模型名称
+            temperature: 0=确定性回答（回答会被磁盘缓存）, 1=创造性回答
+            cache_key: 服务端 prompt cache 的路由键（同角色请求落到同缓存）
         """
         self.model = model
         self.system_prompt = system_prompt
+        self.temperature = temperature
+        self.cache_key = cache_key
         
         # 消息历史 = Agent 的"记忆"
         # 第一条消息永远是系统提示词
         self.messages = [
             {"role": "system", "content": system_prompt}
         ]
-    
+
+        # 字符串驻留表：重复出现的消息内容只保留一份 str 对象
+        # （长对话里用户经常重发相同问题，历史越长省得越多）
+        self._interned: dict[str, str] = {}
+
     def chat(self, user_input: str) -> str:
         """
         与 Agent 对话
@@ -67,20 +93,39 @@ class SimpleAgent:
         返回:
             Agent 的回复
         """
-        # 1. 将用户消息加入历史
+        # 1. 将用户消息加入历史（内容相同的消息复用同一个字符串对象）
+        user_input = self._interned.setdefault(user_input, user_input)
         self.messages.append({"role": "user", "content": user_input})
         
-        # 2. 调用 LLM API
-        response = client.chat.completions.create(
-            model=self.model,
-            messages=self.messages,
-            temperature=0.7,  # 0=确定性回答, 1=创造性回答
-        )
-        
-        # 3. 提取 AI 的回复
-        assistant_message = response.choices[0].message.content
+        # 2. 调用 LLM API（客户端在第一次调用时才创建，之后复用）
+        # temperature=0 时输出确定，可以安全缓存到磁盘；随机输出不缓存
+        cache_key = None
+        assistant_message = None
+        if self.temperature == 0:
+            payload = json.dumps([self.model, self.messages],
+                                 ensure_ascii=False, sort_keys=True)
+            cache_key = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+            assistant_message = _get_llm_cache().get(cache_key)
+
+        if assistant_message is None:
+            # prompt_cache_key 帮助后端把同角色的请求路由到同一份前缀缓存
+            extra_body = (
+                {"prompt_cache_key": self.cache_key} if self.cache_key else None
+            )
+            response = _get_client().chat.completions.create(
+                model=self.model,
+                messages=self.messages,
+                temperature=self.temperature,
+                extra_body=extra_body,
+            )
+
+            # 3. 提取 AI 的回复
+            assistant_message = response.choices[0].message.content
+            if cache_key is not None:
+                _get_llm_cache()[cache_key] = assistant_message
         
         # 4. 将 AI 回复也加入历史（这就是"记忆"！）
+        assistant_message = self._interned.setdefault(assistant_message, assistant_message)
         self.messages.append({"role": "assistant", "content": assistant_message})
         
         return assistant_message
@@ -107,33 +152,32 @@ class SimpleAgent:
 # ==========================================
 # 第三步：创建不同角色的 Agent
 # ==========================================
+# 工厂函数按需创建：用户一般只选一个角色，
+# 没必要在 import 时把三个 Agent 全部实例化
+#
+# 系统提示词定义成模块级常量：每轮请求它都逐字节相同、固定在
+# messages[0]，支持 prompt caching 的后端（OpenAI/DeepSeek 等）
+# 可以直接复用这段前缀的服务端 KV 缓存，跳过重复 prefill。
+# 注意：跟具体用户相关的内容要放进 user 消息，别拼进系统提示词
+
+PYTHON_TUTOR_PROMPT = """你是一个友好的 Python 编程教师。
 
-# Agent 1: Python 编程助手
-python_tutor = SimpleAgent(
-    system_prompt="""你是一个友好的 Python 编程教师。
-    
 你的特点：
 - 用简单易懂的语言解释编程概念
 - 每次回答都提供代码示例
 - 鼓励学生，不批评错误
 - 回答简洁，不超过200字
 - 用中文回答"""
-)
 
-# Agent 2: 翻译助手
-translator = SimpleAgent(
-    system_prompt="""你是一个专业的中英翻译助手。
+TRANSLATOR_PROMPT = """你是一个专业的中英翻译助手。
 
 规则：
 - 如果用户输入中文，翻译为英文
 - 如果用户输入英文，翻译为中文
 - 翻译要自然流畅，不要机械翻译
 - 同时给出直译和意译两个版本"""
-)
 
-# Agent 3: 代码审查助手
-code_reviewer = SimpleAgent(
-    system_prompt="""你是一个严格的代码审查专家。
+CODE_REVIEWER_PROMPT = """你是一个严格的代码审查专家。
 
 你的工作：
 - 分析用户提交的代码
@@ -141,16 +185,50 @@ code_reviewer = SimpleAgent(
 - 给出改进建议
 - 评估代码质量（1-10分）
 - 用中文回答"""
-)
+
+
+def get_python_tutor() -> SimpleAgent:
+    """Agent 1: Python 编程助手"""
+    return SimpleAgent(system_prompt=PYTHON_TUTOR_PROMPT,
+                       cache_key="python_tutor_v1")
+
+
+def get_translator() -> SimpleAgent:
+    """Agent 2: 翻译助手"""
+    return SimpleAgent(system_prompt=TRANSLATOR_PROMPT,
+                       cache_key="translator_v1")
+
+
+def get_code_reviewer() -> SimpleAgent:
+    """Agent 3: 代码审查助手"""
+    return SimpleAgent(system_prompt=CODE_REVIEWER_PROMPT,
+                       cache_key="code_reviewer_v1")
 
 
 # ==========================================
 # 第四步：运行 Agent
 # ==========================================
-def run_interactive_agent(agent: SimpleAgent, agent_name: str):
+# 读取用户输入走异步路径：事件循环在等待键盘时保持空转，
+# 上一轮回答的打印、后台任务都能继续跑，而不是被 input() 整体卡住
+try:
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.patch_stdout import patch_stdout
+
+    _session = PromptSession()
+
+    async def _read_input(prompt: str) -> str:
+        with patch_stdout():
+            return await _session.prompt_async(prompt)
+except ImportError:
+    # 没装 prompt_toolkit 就把阻塞的 input() 丢进线程，同样不挡事件循环
+    async def _read_input(prompt: str) -> str:
+        return await asyncio.to_thread(input, prompt)
+
+
+async def run_interactive_agent(agent: SimpleAgent, agent_name: str):
     """
     启动交互式对话
-    
+
     输入 'quit' 退出
     输入 'memory' 查看记忆
     输入 'reset' 清除记忆
@@ -159,27 +237,32 @@ def run_interactive_agent(agent: SimpleAgent, agent_name: str):
     print(f"🤖 {agent_name} 已启动！")
     print(f"   输入 'quit' 退出 | 'memory' 查看记忆 | 'reset' 清除记忆")
     print(f"{'='*60}\n")
-    
+
     while True:
-        user_input = input("👤 你: ").strip()
-        
+        try:
+            user_input = (await _read_input("👤 你: ")).strip()
+        except (KeyboardInterrupt, EOFError):
+            print("\n👋 再见！")
+            break
+
         if not user_input:
             continue
-        
+
         if user_input.lower() == 'quit':
             print("👋 再见！")
             break
-        
+
         if user_input.lower() == 'memory':
             agent.show_memory()
             continue
-        
+
         if user_input.lower() == 'reset':
             agent.reset_memory()
             continue
-        
+
         try:
-            response = agent.chat(user_input)
+            # API 调用是阻塞的，放进线程执行，循环继续响应
+            response = await asyncio.to_thread(agent.chat, user_input)
             print(f"\n🤖 Agent: {response}\n")
         except Exception as e:
             print(f"\n❌ 错误: {e}")
@@ -194,54 +277,59 @@ def demo_without_api():
     不需要 API Key 的演示
     展示 Agent 的核心逻辑
     """
-    print("\n" + "="*60)
-    print("📖 Agent 核心逻辑演示（不需要 API Key）")
-    print("="*60)
-    
+    # 输出先攒在列表里，最后一次性写出：
+    # 几十次 print（每次一个系统调用）合并成 1 次 write
+    parts = []
+    parts.append("\n" + "="*60)
+    parts.append("📖 Agent 核心逻辑演示（不需要 API Key）")
+    parts.append("="*60)
+
     # 模拟消息历史
     messages = []
-    
+
     # Step 1: 设置系统提示词
     messages.append({
-        "role": "system", 
+        "role": "system",
         "content": "你是一个Python编程助手"
     })
-    print("\n1️⃣ 设置系统提示词:")
-    print(f"   messages = {messages}")
-    
+    parts.append("\n1️⃣ 设置系统提示词:")
+    parts.append(f"   messages = {messages}")
+
     # Step 2: 用户提问
     messages.append({
-        "role": "user", 
+        "role": "user",
         "content": "什么是列表推导式？"
     })
-    print("\n2️⃣ 用户提问后:")
-    print(f"   messages 长度 = {len(messages)}")
-    
+    parts.append("\n2️⃣ 用户提问后:")
+    parts.append(f"   messages 长度 = {len(messages)}")
+
     # Step 3: AI 回答（模拟）
     ai_response = "列表推导式是Python的简洁语法: [x**2 for x in range(10)]"
     messages.append({
-        "role": "assistant", 
+        "role": "assistant",
         "content": ai_response
     })
-    print(f"\n3️⃣ AI 回答: {ai_response}")
-    
+    parts.append(f"\n3️⃣ AI 回答: {ai_response}")
+
     # Step 4: 用户追问（Agent 有记忆！）
     messages.append({
-        "role": "user", 
+        "role": "user",
         "content": "能给个更复杂的例子吗？"
     })
-    print("\n4️⃣ 用户追问: '能给个更复杂的例子吗？'")
-    print(f"   此时 messages 有 {len(messages)} 条消息")
-    print("   → AI 能看到之前的对话，所以知道你在问列表推导式的例子！")
-    print("   → 这就是'记忆'的本质：把历史消息都发给 AI")
-    
-    print("\n" + "="*60)
-    print("🎓 关键收获:")
-    print("   1. Agent 的'记忆' = 消息列表 (messages)")
-    print("   2. 每次调用 API 都发送完整的消息历史")
-    print("   3. 系统提示词决定了 Agent 的'人格'")
-    print("   4. 核心循环: 用户输入 → 加入历史 → 调用AI → 回复加入历史")
-    print("="*60)
+    parts.append("\n4️⃣ 用户追问: '能给个更复杂的例子吗？'")
+    parts.append(f"   此时 messages 有 {len(messages)} 条消息")
+    parts.append("   → AI 能看到之前的对话，所以知道你在问列表推导式的例子！")
+    parts.append("   → 这就是'记忆'的本质：把历史消息都发给 AI")
+
+    parts.append("\n" + "="*60)
+    parts.append("🎓 关键收获:")
+    parts.append("   1. Agent 的'记忆' = 消息列表 (messages)")
+    parts.append("   2. 每次调用 API 都发送完整的消息历史")
+    parts.append("   3. 系统提示词决定了 Agent 的'人格'")
+    parts.append("   4. 核心循环: 用户输入 → 加入历史 → 调用AI → 回复加入历史")
+    parts.append("="*60)
+
+    sys.stdout.write("\n".join(parts) + "\n")
 
 
 # ==========================================
@@ -264,13 +352,13 @@ if __name__ == "__main__":
     choice = input("\n请选择 (0-3): ").strip()
     
     agents = {
-        "1": (python_tutor, "Python 编程助手"),
-        "2": (translator, "中英翻译助手"),
-        "3": (code_reviewer, "代码审查助手"),
+        "1": (get_python_tutor, "Python 编程助手"),
+        "2": (get_translator, "中英翻译助手"),
+        "3": (get_code_reviewer, "代码审查助手"),
     }
-    
+
     if choice in agents:
-        agent, name = agents[choice]
-        run_interactive_agent(agent, name)
+        factory, name = agents[choice]
+        asyncio.run(run_interactive_agent(factory(), name))
     else:
         print("👋 教程结束，请继续学习 02_tool_agent.py！")
@@ -23,19 +23,59 @@
 """
 
 import os
+import re
+import sys
+import ast
 import json
 import math
+import asyncio
+import functools
+from types import MappingProxyType
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import httpx
 from openai import OpenAI
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# 全模块共用一个客户端：连接池 + HTTP/2 多路复用
+# ToolAgent 每轮要打 2 次 API，复用 TCP/TLS 连接省掉每次的握手开销
+# （HTTP/2 需要 h2 包：pip install httpx[http2]）
+_http = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+    timeout=60.0,
+)
 client = OpenAI(
     api_key=os.getenv("OPENAI_API_KEY", "your-api-key"),
     base_url=os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1"),
+    http_client=_http,
 )
 
+# JSON 编解码在每次工具调用的热路径上（解析参数 + 序列化结果），
+# 优先用 C 实现的 orjson（快 3-10 倍、分配更少）；未安装则退回标准库
+try:
+    import orjson
+
+    def _json_loads(s):
+        return orjson.loads(s)
+
+    def _json_dumps(obj) -> str:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            # orjson 只支持 64 位以内的整数；calculate("2**64") 这类
+            # 合法结果要回退 stdlib，不能把限制变成工具报错
+            return json.dumps(obj, ensure_ascii=False)
+except ImportError:
+    def _json_loads(s):
+        return json.loads(s)
+
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
 
 # ==========================================
 # 第一步：定义工具函数
@@ -43,27 +83,73 @@ client = OpenAI(
 # 这些是 Agent 可以调用的"工具"
 # 每个工具就是一个普通的 Python 函数
 
+# 计算器允许的名字（模块加载时建一次）
+_ALLOWED_NAMES = {
+    "abs": abs, "round": round,
+    "min": min, "max": max,
+    "sum": sum, "len": len,
+    "pow": pow, "sqrt": math.sqrt,
+    "sin": math.sin, "cos": math.cos,
+    "tan": math.tan, "pi": math.pi,
+    "e": math.e, "log": math.log,
+}
+
+# 表达式里允许出现的 AST 节点：只放行字面量、算术运算和白名单函数调用
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant,
+    ast.Call, ast.Name, ast.Load, ast.Tuple, ast.List,
+    ast.operator, ast.unaryop,
+)
+
+
+def _validate_expr(tree: ast.AST):
+    """白名单校验：出现名单之外的节点（属性访问、下标、推导式等）直接拒绝"""
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"表达式包含不允许的语法: {type(node).__name__}")
+        if isinstance(node, ast.Name) and node.id not in _ALLOWED_NAMES:
+            raise ValueError(f"表达式包含不允许的名字: {node.id}")
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_expr(expression: str):
+    """解析 → 白名单校验 → 编译，并按表达式字符串缓存 code 对象。
+
+    重复的表达式（演示/测试里很常见）直接命中缓存，零解析成本。
+    """
+    tree = ast.parse(expression, mode="eval")
+    _validate_expr(tree)
+    return compile(tree, "<calc>", "eval")
+
+
+# 可选加速：numexpr 把数值表达式编译成向量化的本地代码并缓存，
+# 且本身就不支持属性访问/下标等危险语法；未安装则全部走 AST 路径
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+_NUMEXPR_CONSTS = {"pi": math.pi, "e": math.e}
+
+
 def calculate(expression: str) -> str:
     """
     计算数学表达式
     这是 Agent 的 "计算器工具"
     """
+    if numexpr is not None:
+        try:
+            result = numexpr.evaluate(expression, local_dict=_NUMEXPR_CONSTS).item()
+            return _json_dumps({"result": result, "expression": expression})
+        except Exception:
+            # numexpr 不认识的写法（如 pow(2, 10)、len(...)）退回 AST 路径
+            pass
     try:
-        # 安全地计算数学表达式
-        # 注意：实际项目中需要更严格的安全检查
-        allowed_names = {
-            "abs": abs, "round": round,
-            "min": min, "max": max,
-            "sum": sum, "len": len,
-            "pow": pow, "sqrt": math.sqrt,
-            "sin": math.sin, "cos": math.cos,
-            "tan": math.tan, "pi": math.pi,
-            "e": math.e, "log": math.log,
-        }
-        result = eval(expression, {"__builtins__": {}}, allowed_names)
-        return json.dumps({"result": result, "expression": expression})
+        # 编译结果带缓存；AST 白名单比"清空 __builtins__"严格得多
+        result = eval(_compile_expr(expression), {"__builtins__": {}}, _ALLOWED_NAMES)
+        return _json_dumps({"result": result, "expression": expression})
     except Exception as e:
-        return json.dumps({"error": str(e), "expression": expression})
+        return _json_dumps({"error": str(e), "expression": expression})
 
 
 def get_current_time(timezone: str = "UTC") -> str:
@@ -72,38 +158,48 @@ def get_current_time(timezone: str = "UTC") -> str:
     这是 Agent 的 "时钟工具"
     """
     now = datetime.now()
-    return json.dumps({
+    return _json_dumps({
         "current_time": now.strftime("%Y-%m-%d %H:%M:%S"),
         "timezone": timezone,
         "day_of_week": now.strftime("%A"),
     })
 
 
+# 模拟知识库：模块加载时建一次，不再每次调用都重新分配
+# 实际项目中可以连接数据库、向量数据库、搜索引擎等
+_KNOWLEDGE = {
+    "python": "Python 是一种高级编程语言，由 Guido van Rossum 创建于 1991 年。特点：简洁、易读、功能强大。",
+    "agent": "AI Agent 是能够自主感知环境、做出决策并采取行动的智能实体。核心组件：LLM + 工具 + 记忆 + 规划。",
+    "langchain": "LangChain 是一个用于开发 LLM 应用的框架，提供了链、Agent、记忆等抽象。",
+    "react": "ReAct 是一种 Agent 决策模式：Reasoning（推理）+ Acting（行动），让 Agent 交替进行思考和工具调用。",
+    "rag": "RAG (Retrieval-Augmented Generation) 是检索增强生成，先检索相关文档，再用 LLM 生成回答。",
+}
+
+# 小写键也预先算好：循环里不再重复 .lower()
+_KNOWLEDGE_LOWER = [(k, k.lower(), v) for k, v in _KNOWLEDGE.items()]
+
+
 def search_knowledge_base(query: str) -> str:
     """
     搜索知识库（模拟）
     这是 Agent 的 "搜索工具"
-    实际项目中可以连接数据库、向量数据库、搜索引擎等
     """
-    # 模拟知识库
-    knowledge = {
-        "python": "Python 是一种高级编程语言，由 Guido van Rossum 创建于 1991 年。特点：简洁、易读、功能强大。",
-        "agent": "AI Agent 是能够自主感知环境、做出决策并采取行动的智能实体。核心组件：LLM + 工具 + 记忆 + 规划。",
-        "langchain": "LangChain 是一个用于开发 LLM 应用的框架，提供了链、Agent、记忆等抽象。",
-        "react": "ReAct 是一种 Agent 决策模式：Reasoning（推理）+ Acting（行动），让 Agent 交替进行思考和工具调用。",
-        "rag": "RAG (Retrieval-Augmented Generation) 是检索增强生成，先检索相关文档，再用 LLM 生成回答。",
-    }
-    
-    # 简单的关键词匹配搜索
-    results = []
-    for key, value in knowledge.items():
-        if query.lower() in key.lower() or key.lower() in query.lower():
-            results.append({"topic": key, "content": value})
-    
+    # 简单的关键词匹配搜索：query 只 lower 一次
+    q = query.lower()
+    results = [
+        {"topic": key, "content": value}
+        for key, key_lower, value in _KNOWLEDGE_LOWER
+        if q in key_lower or key_lower in q
+    ]
+
     if not results:
-        return json.dumps({"message": "未找到相关信息", "query": query})
+        return _json_dumps({"message": "未找到相关信息", "query": query})
     
-    return json.dumps({"results": results, "query": query})
+    return _json_dumps({"results": results, "query": query})
+
+
+# 中文字符的正则，模块加载时编译一次
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]')
 
 
 def analyze_text(text: str, analysis_type: str = "summary") -> str:
@@ -111,20 +207,23 @@ def analyze_text(text: str, analysis_type: str = "summary") -> str:
     文本分析工具
     支持：字数统计、关键词提取（模拟）
     """
+    # split 只做一次，word_count 复用结果
+    words = text.split()
     result = {
         "char_count": len(text),
-        "word_count": len(text.split()),
+        "word_count": len(words),
         "line_count": text.count('\n') + 1,
         "analysis_type": analysis_type,
     }
-    
+
     if analysis_type == "statistics":
-        # 统计中文字符数
-        chinese_chars = sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
+        # 统计中文字符数：C 层的正则扫描，
+        # 比逐字符的 Python 循环快一到两个数量级
+        chinese_chars = len(_CJK_RE.findall(text))
         result["chinese_char_count"] = chinese_chars
         result["english_word_count"] = result["word_count"] - chinese_chars
-    
-    return json.dumps(result)
+
+    return _json_dumps(result)
 
 
 # ==========================================
@@ -132,8 +231,10 @@ def analyze_text(text: str, analysis_type: str = "summary") -> str:
 # ==========================================
 # 这是 OpenAI Function Calling 的标准格式
 # LLM 根据这些描述来决定使用哪个工具
+# tuple + MappingProxyType：schema 是只读常量，防止运行中被意外改动，
+# 也向读者表明每次 API 调用传的都是同一个对象，不存在按次拷贝
 
-TOOLS = [
+TOOLS = (
     {
         "type": "function",
         "function": {
@@ -209,14 +310,36 @@ TOOLS = [
             }
         }
     },
-]
+)
 
-# 工具名称 → 函数的映射
-TOOL_FUNCTIONS = {
+# 工具名称 → 函数的映射（只读视图）
+TOOL_FUNCTIONS = MappingProxyType({
     "calculate": calculate,
     "get_current_time": get_current_time,
     "search_knowledge_base": search_knowledge_base,
     "analyze_text": analyze_text,
+})
+
+
+# ==========================================
+# 快路径：简单工具的结果直接模板化
+# ==========================================
+# 计算器、时钟这类工具的输出本身就是答案，
+# 不需要再花一次 LLM 调用去"润色"——模板化返回 None 表示走不了快路径
+
+def _format_calculate(data: dict):
+    if "error" in data:
+        return None  # 出错时还是交给 LLM 解释
+    return f"计算结果：{data['expression']} = {data['result']}"
+
+
+def _format_time(data: dict):
+    return f"现在是 {data['current_time']}（{data['day_of_week']}，{data['timezone']} 时区）"
+
+
+_FAST_PATH_TOOLS = {
+    "calculate": _format_calculate,
+    "get_current_time": _format_time,
 }
 
 
@@ -236,12 +359,20 @@ class ToolAgent:
        - 如果否：LLM 直接回答
     """
     
-    def __init__(self, model: str = "gpt-3.5-turbo"):
+    def __init__(self, model: str = "gpt-3.5-turbo", max_turns: int = 10,
+                 fast_path: bool = True):
         self.model = model
-        self.messages = [
-            {
-                "role": "system",
-                "content": """你是一个能力强大的 AI 助手，你拥有以下工具：
+        # fast_path=True 时，单个简单工具的结果直接模板化输出，
+        # 跳过第二次 LLM 调用；设为 False 可以对比两种模式的延迟
+        self.fast_path = fast_path
+        # 历史只保留最近 max_turns 轮：每轮都会把全部历史重发给 LLM，
+        # 不加上限的话单轮的 token 成本和延迟会随会话长度线性增长
+        # 系统提示词单独存放（永不被淘汰），对话历史用带 maxlen 的 deque：
+        # 超限时最旧的消息 O(1) 自动弹出，没有列表切片拷贝
+        self.max_turns = max_turns
+        self.system_message = {
+            "role": "system",
+            "content": """你是一个能力强大的 AI 助手，你拥有以下工具：
 1. 计算器 - 进行精确的数学计算
 2. 时钟 - 获取当前时间
 3. 知识库搜索 - 查找技术知识
@@ -249,75 +380,189 @@ class ToolAgent:
 
 请根据用户的问题，选择合适的工具来回答。如果不需要工具，直接回答即可。
 回答使用中文。"""
-            }
-        ]
+        }
+        self.messages: deque = deque(maxlen=2 * max_turns)
     
-    def chat(self, user_input: str) -> str:
-        """与 Agent 对话，Agent 会自动决定是否使用工具"""
-        
+    def chat_stream(self, user_input: str):
+        """与 Agent 对话（流式），Agent 会自动决定是否使用工具
+
+        两次 LLM 调用都用 stream=True：token 一到就 yield 出去，
+        首 token 延迟从"整个回答生成完"缩短到"第一个 token 生成完"。
+        工具调用的参数是分片流过来的，按 index 拼好再执行。
+        """
+
         self.messages.append({"role": "user", "content": user_input})
-        
+        # 追加就可能触发 deque 左端淘汰，发请求前先把孤儿 tool 回复清掉
+        self._trim()
+
         print(f"\n🔄 正在思考...")
-        
+
         # 第一次调用 LLM：让它决定要不要用工具
         response = client.chat.completions.create(
             model=self.model,
-            messages=self.messages,
+            messages=[self.system_message, *self.messages],
             tools=TOOLS,           # ← 告诉 LLM 有哪些工具
             tool_choice="auto",    # ← "auto" = LLM 自己决定要不要用工具
+            stream=True,
         )
-        
-        response_message = response.choices[0].message
-        
+
+        content_parts: list[str] = []
+        # index -> {id, name, arguments}，arguments 是分片累积的
+        tool_calls: dict[int, dict] = {}
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content_parts.append(delta.content)
+                yield delta.content
+            for tc in delta.tool_calls or []:
+                entry = tool_calls.setdefault(
+                    tc.index, {"id": "", "name": "", "arguments": ""}
+                )
+                if tc.id:
+                    entry["id"] = tc.id
+                if tc.function and tc.function.name:
+                    entry["name"] = tc.function.name
+                if tc.function and tc.function.arguments:
+                    entry["arguments"] += tc.function.arguments
+
         # 检查 LLM 是否想调用工具
-        if response_message.tool_calls:
+        if tool_calls:
             # LLM 决定要用工具！
             print(f"🔧 Agent 决定使用工具！")
-            
+
             # 将 LLM 的回复（包含工具调用信息）加入消息历史
-            self.messages.append(response_message)
-            
-            # 执行每个工具调用
-            for tool_call in response_message.tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
-                
+            calls = [entry for _, entry in sorted(tool_calls.items())]
+            self.messages.append({
+                "role": "assistant",
+                "content": "".join(content_parts) or None,
+                "tool_calls": [
+                    {
+                        "id": entry["id"],
+                        "type": "function",
+                        "function": {
+                            "name": entry["name"],
+                            "arguments": entry["arguments"],
+                        },
+                    }
+                    for entry in calls
+                ],
+            })
+
+            # 并行执行所有工具调用
+            # 搜索/HTTP 这类工具是 I/O 型，并行后总耗时趋近最慢的那一个，
+            # 而不是所有工具耗时之和
+            def _invoke(entry: dict) -> str:
+                function_name = entry["name"]
+                function_args = _json_loads(entry["arguments"])
+
                 print(f"   📌 调用工具: {function_name}")
                 print(f"   📎 参数: {function_args}")
-                
-                # 执行工具函数
-                if function_name in TOOL_FUNCTIONS:
-                    function_result = TOOL_FUNCTIONS[function_name](**function_args)
-                else:
-                    function_result = json.dumps({"error": f"未知工具: {function_name}"})
-                
+
+                # 执行工具函数：.get() 一次查找完成"存在性检查 + 取值"
+                fn = TOOL_FUNCTIONS.get(function_name)
+                if fn is None:
+                    return _json_dumps({"error": f"未知工具: {function_name}"})
+                return fn(**function_args)
+
+            if len(calls) == 1:
+                results = [_invoke(calls[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+                    results = list(pool.map(_invoke, calls))
+
+            # 按原顺序把工具结果加入消息历史（必须与 tool_calls 一一对应）
+            for entry, function_result in zip(calls, results):
                 print(f"   ✅ 工具结果: {function_result[:100]}...")
-                
-                # 将工具结果加入消息历史
                 self.messages.append({
-                    "tool_call_id": tool_call.id,
+                    "tool_call_id": entry["id"],
                     "role": "tool",
-                    "name": function_name,
+                    "name": entry["name"],
                     "content": function_result,
                 })
-            
-            # 第二次调用 LLM：让它根据工具结果生成最终回答
+
+            # 快路径：只调了一个简单工具且结果是标量时，直接模板化输出，
+            # 省掉第二次 LLM 调用（这一轮的延迟和费用直接减半）
+            if self.fast_path and len(calls) == 1:
+                formatter = _FAST_PATH_TOOLS.get(calls[0]["name"])
+                if formatter is not None:
+                    answer = formatter(_json_loads(results[0]))
+                    if answer is not None:
+                        print(f"⚡ 快路径：工具结果已足够，跳过第二次 LLM 调用")
+                        self.messages.append({"role": "assistant", "content": answer})
+                        yield answer
+                        self._trim()
+                        return
+
+            # 第二次调用 LLM：让它根据工具结果生成最终回答（同样流式）
+            # 工具结果刚 append 过，窗口满时左端可能正好淘汰到
+            # assistant/tool 边界，同样要先清孤儿再发请求
+            self._trim()
             print(f"🔄 Agent 正在根据工具结果生成回答...")
             second_response = client.chat.completions.create(
                 model=self.model,
-                messages=self.messages,
+                messages=[self.system_message, *self.messages],
+                stream=True,
             )
-            
-            final_answer = second_response.choices[0].message.content
-            self.messages.append({"role": "assistant", "content": final_answer})
-            return final_answer
-        
+
+            final_parts: list[str] = []
+            for chunk in second_response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    final_parts.append(delta.content)
+                    yield delta.content
+
+            self.messages.append({"role": "assistant", "content": "".join(final_parts)})
+
         else:
-            # LLM 决定不用工具，直接回答
+            # LLM 决定不用工具，直接回答（token 已经边收边 yield 了）
             print(f"💬 Agent 直接回答（不需要工具）")
-            answer = response_message.content
-            self.messages.append({"role": "assistant", "content": answer})
-            return answer
+            self.messages.append({"role": "assistant", "content": "".join(content_parts)})
+
+        self._trim()
+
+    def _trim(self):
+        """deque(maxlen=...) 已经自动完成滑动窗口淘汰
+
+        这里只需把淘汰边缘可能留下的孤儿 tool 回复弹掉（popleft 是 O(1)），
+        否则历史里会出现没有对应 tool_calls 的 tool 回复。
+        每次 append 之后、发请求之前都要调：淘汰发生在 append 时，
+        只在回合结束清理的话，回合中间的请求仍可能以 tool 开头被拒。
+        """
+        while self.messages and self.messages[0]["role"] == "tool":
+            self.messages.popleft()
+
+    def chat(self, user_input: str) -> str:
+        """非流式包装：把 chat_stream 的 token 拼成完整回答返回"""
+        return "".join(self.chat_stream(user_input))
+
+    def chat_many(self, inputs: list[str]) -> list[str]:
+        """批量提问：N 个问题合并成 1 次 LLM 往返
+
+        把问题拼成编号列表一次性发出，网络往返从 N 次降到 1 次；
+        需要工具时模型也可以在一次回复里给出多个 tool_calls，
+        配合上面的并行执行一起生效。
+        """
+        if not inputs:
+            return []
+        if len(inputs) == 1:
+            return [self.chat(inputs[0])]
+
+        numbered = "\n".join(f"{i}. {q}" for i, q in enumerate(inputs, 1))
+        combined = (
+            "请依次回答下面每个编号问题，"
+            "不同问题的答案之间用单独一行 '---' 分隔：\n" + numbered
+        )
+        raw = self.chat(combined)
+
+        answers = [part.strip() for part in raw.split("---") if part.strip()]
+        if len(answers) == len(inputs):
+            return answers
+        # 模型偶尔漏掉分隔符：宁可整段返回，也不丢内容
+        return [raw]
 
 
 # ==========================================
@@ -328,11 +573,13 @@ def demo_tool_calling():
     """
     演示工具调用的完整流程（不需要 API Key）
     """
-    print("\n" + "="*60)
-    print("📖 工具调用核心逻辑演示")
-    print("="*60)
-    
-    print("""
+    # 输出攒进列表最后一次性写出：几十次 print 合并成 1 次系统调用
+    parts = []
+    parts.append("\n" + "="*60)
+    parts.append("📖 工具调用核心逻辑演示")
+    parts.append("="*60)
+
+    parts.append("""
 🔍 场景：用户问 "2的10次方等于多少？"
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -360,13 +607,13 @@ Step 2: 发送给 LLM（附带工具列表）
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 Step 3: 执行工具函数
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━""")
-    
+
     # 实际执行计算
     result = calculate("pow(2, 10)")
-    print(f"  执行: calculate(expression='pow(2, 10)')")
-    print(f"  结果: {result}")
-    
-    print(f"""
+    parts.append(f"  执行: calculate(expression='pow(2, 10)')")
+    parts.append(f"  结果: {result}")
+
+    parts.append(f"""
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 Step 4: 将结果发回 LLM
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -378,19 +625,72 @@ Step 4: 将结果发回 LLM
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 """)
-    
-    print("🎓 关键收获:")
-    print("  1. LLM 不直接执行工具，而是'告诉我们'要用什么工具和参数")
-    print("  2. 我们的代码负责实际执行工具")
-    print("  3. 工具结果发回 LLM，LLM 生成最终回答")
-    print("  4. 整个过程调用了 2 次 LLM API")
-    print()
-    
+
+    parts.append("🎓 关键收获:")
+    parts.append("  1. LLM 不直接执行工具，而是'告诉我们'要用什么工具和参数")
+    parts.append("  2. 我们的代码负责实际执行工具")
+    parts.append("  3. 工具结果发回 LLM，LLM 生成最终回答")
+    parts.append("  4. 整个过程调用了 2 次 LLM API")
+    parts.append("")
+
     # 演示其他工具
-    print("📦 工具演示：")
-    print(f"  时钟: {get_current_time()}")
-    print(f"  搜索: {search_knowledge_base('agent')}")
-    print(f"  分析: {analyze_text('Hello 你好世界', 'statistics')}")
+    parts.append("📦 工具演示：")
+    parts.append(f"  时钟: {get_current_time()}")
+    parts.append(f"  搜索: {search_knowledge_base('agent')}")
+    parts.append(f"  分析: {analyze_text('Hello 你好世界', 'statistics')}")
+
+    sys.stdout.write("\n".join(parts) + "\n")
+
+
+# ==========================================
+# 第五步：异步交互循环
+# ==========================================
+# 读输入走 prompt_toolkit 的异步接口：等待键盘时事件循环不被阻塞，
+# 流式打印可以和输入读取并存（没装 prompt_toolkit 则退回线程中的 input()）
+try:
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.patch_stdout import patch_stdout
+
+    _session = PromptSession()
+
+    async def _read_input(prompt: str) -> str:
+        with patch_stdout():
+            return await _session.prompt_async(prompt)
+except ImportError:
+    async def _read_input(prompt: str) -> str:
+        return await asyncio.to_thread(input, prompt)
+
+
+def _stream_print(agent: ToolAgent, user_input: str):
+    """消费 chat_stream，token 一到就打印（在线程中运行，不挡事件循环）
+
+    占位前缀先落屏，让用户立刻看到"开始回答了"；之后每个增量
+    write + flush 一次，终端以打字机节奏逐 token 重绘，而不是
+    攒满一行才显示。
+    """
+    sys.stdout.write("\n🤖 Agent: ")
+    sys.stdout.flush()
+    for token in agent.chat_stream(user_input):
+        sys.stdout.write(token)
+        sys.stdout.flush()
+    sys.stdout.write("\n\n")
+    sys.stdout.flush()
+
+
+async def interactive_loop(agent: ToolAgent):
+    """交互式 REPL：输入 'quit' 退出"""
+    while True:
+        try:
+            user_input = (await _read_input("👤 你: ")).strip()
+        except (KeyboardInterrupt, EOFError):
+            break
+        if user_input.lower() == 'quit':
+            break
+        if user_input:
+            try:
+                await asyncio.to_thread(_stream_print, agent, user_input)
+            except Exception as e:
+                print(f"❌ 错误: {e}\n")
 
 
 # ==========================================
@@ -399,17 +699,17 @@ Step 4: 将结果发回 LLM
 if __name__ == "__main__":
     print("\n🚀 AI Agent 教程 — Level 2: 工具调用 Agent")
     print("=" * 60)
-    
+
     # 运行演示
     demo_tool_calling()
-    
+
     # 交互模式
     print("\n是否启动交互式工具 Agent？(需要 API Key)")
     print("  1. 启动")
     print("  0. 退出")
-    
+
     choice = input("\n请选择: ").strip()
-    
+
     if choice == "1":
         agent = ToolAgent()
         print("\n🤖 工具 Agent 已启动！")
@@ -417,16 +717,7 @@ if __name__ == "__main__":
         print("   试试：'现在几点了？'")
         print("   试试：'帮我查一下什么是 RAG'")
         print("   输入 'quit' 退出\n")
-        
-        while True:
-            user_input = input("👤 你: ").strip()
-            if user_input.lower() == 'quit':
-                break
-            if user_input:
-                try:
-                    response = agent.chat(user_input)
-                    print(f"\n🤖 Agent: {response}\n")
-                except Exception as e:
-                    print(f"❌ 错误: {e}\n")
-    
+
+        asyncio.run(interactive_loop(agent))
+
     print("👋 教程结束，请继续学习 03_react_agent.py！")
@@ -29,8 +29,15 @@
 
 import os
 import re
+import ast
 import json
 import math
+import uuid
+import asyncio
+import hashlib
+import operator
+import functools
+from collections import defaultdict
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -45,6 +52,9 @@ load_dotenv()
 
 class Tool:
     """工具基类"""
+    # 基类只有两个字段，用 __slots__ 省掉每个实例的 __dict__
+    __slots__ = ("name", "description")
+
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
@@ -53,6 +63,58 @@ class Tool:
         raise NotImplementedError
 
 
+# 计算器允许的名字，模块加载时建一次，不必每次调用重建
+_ALLOWED = {
+    "abs": abs, "round": round, "pow": pow,
+    "sqrt": math.sqrt, "sin": math.sin, "cos": math.cos,
+    "pi": math.pi, "e": math.e, "log": math.log,
+}
+
+
+# Agent 循环里最常见的表达式形态（如 "人口 / 面积" 这类纯数字二元运算），
+# 直接按 AST 形态分发到原生函数，省掉 eval 的解释器帧开销
+_FAST_BINOPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub,
+    ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+}
+_FAST_FUNCS = {"sqrt": math.sqrt, "sin": math.sin, "cos": math.cos, "log": math.log}
+
+
+def _fast_eval(expression: str):
+    """识别 'a op b' / 'func(x)' 这类简单形态并直接求值。
+
+    认不出的形态返回 None，交给通用的 compile+eval 路径处理。
+    """
+    try:
+        node = ast.parse(expression, mode='eval').body
+    except SyntaxError:
+        return None
+
+    # 纯数字二元运算: 21540000 / 16410
+    if (isinstance(node, ast.BinOp) and type(node.op) in _FAST_BINOPS and
+            isinstance(node.left, ast.Constant) and isinstance(node.right, ast.Constant)):
+        return _FAST_BINOPS[type(node.op)](node.left.value, node.right.value)
+
+    # 单参数数学函数: sqrt(144)
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and
+            node.func.id in _FAST_FUNCS and len(node.args) == 1 and
+            not node.keywords and isinstance(node.args[0], ast.Constant)):
+        return _FAST_FUNCS[node.func.id](node.args[0].value)
+
+    return None
+
+
+@functools.lru_cache(maxsize=512)
+def _compile_expr(expression: str):
+    """把表达式编译成 code 对象并缓存。
+
+    短表达式的耗时大头在词法/语法分析和编译，
+    Agent 循环里经常重复计算相似的子表达式，缓存后只剩执行这一步。
+    """
+    return compile(expression, '<calc>', 'eval')
+
+
 class CalculatorTool(Tool):
     """计算器工具"""
     def __init__(self):
@@ -60,20 +122,25 @@ class CalculatorTool(Tool):
             name="Calculator",
             description="用于数学计算。输入数学表达式，返回计算结果。例如: '2 + 3 * 4' 或 'sqrt(144)'"
         )
-    
+
     def run(self, expression: str) -> str:
         try:
-            allowed = {
-                "abs": abs, "round": round, "pow": pow,
-                "sqrt": math.sqrt, "sin": math.sin, "cos": math.cos,
-                "pi": math.pi, "e": math.e, "log": math.log,
-            }
-            result = eval(expression.strip(), {"__builtins__": {}}, allowed)
+            # 先走快速通道，认不出的形态再退回通用 eval
+            result = _fast_eval(expression.strip())
+            if result is None:
+                code = _compile_expr(expression.strip())
+                result = eval(code, {"__builtins__": {}}, _ALLOWED)
             return f"计算结果: {expression} = {result}"
         except Exception as e:
             return f"计算错误: {e}"
 
 
+# 分词用正则（\w 同时匹配中文和英文字符）
+# 英文/数字按词切，中日韩文字逐字切：\w+ 会把整段中文粘成一个
+# token，导致 "北京" 查不到 "北京人口" 这类条目
+_TOKEN_RE = re.compile(r'[0-9a-zA-Z_]+|[\u4e00-\u9fff]')
+
+
 class SearchTool(Tool):
     """知识搜索工具"""
     def __init__(self):
@@ -94,17 +161,68 @@ class SearchTool(Tool):
             "上海面积": "上海市总面积约 6340.5 平方公里。",
             "地球太阳距离": "地球到太阳的平均距离约 1.496 亿公里（1个天文单位 AU）。",
         }
-    
+        # 倒排索引：token -> 命中条目下标集合
+        # 逐条线性扫描是 O(条目数 × 查询词数)，倒排后每个查询词只做一次字典查找
+        self._values = list(self.knowledge.values())
+        self._keys = [k.lower() for k in self.knowledge]
+        self._lower_values = [v.lower() for v in self._values]
+        self._index: dict[str, set[int]] = defaultdict(set)
+        for i, (key, value) in enumerate(self.knowledge.items()):
+            for tok in _TOKEN_RE.findall(f"{key} {value}".lower()):
+                self._index[tok].add(i)
+        # 每个键的 token 集合预先算好，匹配时只做 C 层的 frozenset 交集，
+        # 不再做逐词、双向的子串扫描
+        self._key_tokens = [
+            frozenset(_TOKEN_RE.findall(k.lower())) for k in self.knowledge
+        ]
+        # 查询结果缓存：ReAct 多步推理经常重发相同的搜索
+        # （lru_cache 挂在方法上会把 self 锁在缓存里，这里用实例字典就够了）
+        self._cache: dict[str, str] = {}
+        self.cache_hits = 0
+
     def run(self, query: str) -> str:
-        results = []
-        for key, value in self.knowledge.items():
-            if any(word in key for word in query.lower().split()) or \
-               any(word in query.lower() for word in key.split()):
-                results.append(value)
-        
-        if results:
-            return "搜索结果: " + " | ".join(results)
-        return f"未找到'{query}'的相关信息。尝试使用不同的关键词搜索。"
+        qkey = query.strip().lower()
+        cached = self._cache.get(qkey)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+
+        # 查询只分词一次，之后全是 set 操作
+        qtoks = frozenset(_TOKEN_RE.findall(qkey))
+        hits: set[int] = set()
+        for tok in qtoks:
+            hits |= self._index.get(tok, set())
+
+        # 键命中的条目更相关，优先返回。只有正文命中时，要求某个
+        # 完整查询词确实以子串形式出现在正文里——逐字索引只负责
+        # 缩小候选范围，不然沾到一两个字的条目也会被拉进来
+        qwords = qkey.split()
+        key_hits = [i for i in sorted(hits) if qtoks & self._key_tokens[i]]
+        chosen = key_hits or [
+            i for i in sorted(hits)
+            if any(w in self._lower_values[i] for w in qwords)
+        ]
+        if not chosen:
+            # 兜底：token 没命中时退回旧版的双向子串扫描，
+            # 覆盖英文前缀这类部分匹配（如 "transfor"）
+            qwords = qkey.split()
+            chosen = [
+                i for i, key in enumerate(self._keys)
+                if any(w in key for w in qwords)
+                or any(w in qkey for w in key.split())
+            ]
+        if chosen:
+            result = "搜索结果: " + " | ".join(self._values[i] for i in chosen)
+        else:
+            result = f"未找到'{query}'的相关信息。尝试使用不同的关键词搜索。"
+
+        self._cache[qkey] = result
+        return result
+
+
+# 星期表和时间格式是常量，放在模块层，避免每次调用重建 7 个字符串的列表
+_WEEKDAYS = ('一', '二', '三', '四', '五', '六', '日')
+_DT_FMT = '%Y年%m月%d日 %H:%M:%S'
 
 
 class DateTimeTool(Tool):
@@ -114,16 +232,42 @@ class DateTimeTool(Tool):
             name="DateTime",
             description="获取当前日期和时间信息。输入'now'获取当前时间，或输入日期格式问题。"
         )
-    
+
     def run(self, input_str: str) -> str:
+        # datetime.now() 只取一次，格式化和取星期复用同一个结果
         now = datetime.now()
-        return f"当前时间: {now.strftime('%Y年%m月%d日 %H:%M:%S')}，星期{['一','二','三','四','五','六','日'][now.weekday()]}"
+        return f"当前时间: {now.strftime(_DT_FMT)}，星期{_WEEKDAYS[now.weekday()]}"
 
 
 # ==========================================
 # 第二步：实现 ReAct Agent（纯 Prompt 方式）
 # ==========================================
 
+# 解析 LLM 输出用的正则，在模块加载时编译一次
+# （re 内部有缓存，但每次调用仍要过一遍锁+字典查找，并发场景下会抢 re._cache）
+_ACTION_PAIR_RE = re.compile(r"Action:\s*(.+?)\nAction Input:\s*(.+?)(?:\n|$)")
+_ACTION_BLOCK_DONE_RE = re.compile(r"Action Input:\s*.+\n\s*\n")
+_FINAL_TAG = "Final Answer:"
+
+# LLM 响应的磁盘缓存：教学/演示场景经常跨进程重放同一个问题，
+# temperature=0 时输出是确定的，第二次运行直接命中缓存，省掉整个 API 调用
+@functools.cache
+def _get_llm_cache():
+    from diskcache import Cache
+    return Cache('.llm_cache')
+
+
+def _llm_cache_key(model: str, messages: list[dict]) -> str:
+    payload = json.dumps([model, messages], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# 消息历史滑动窗口：保留最近几轮 (Thought/Action, Observation)，
+# 更早的轮次折叠进系统提示词的"已知结论"里。
+# 不压缩的话每步都重发全部历史，发送的 token 量随步数平方增长
+_HISTORY_WINDOW = 3
+
+
 class ReActAgent:
     """
     ReAct Agent — 使用思考-行动-观察循环
@@ -132,31 +276,59 @@ class ReActAgent:
     不依赖 OpenAI 的 function calling，更好理解底层原理。
     """
     
-    def __init__(self, tools: list[Tool], model: str = "gpt-3.5-turbo", max_steps: int = 5):
+    def __init__(self, tools: list[Tool], model: str = "gpt-3.5-turbo",
+                 max_steps: int = 5, prefix_cache: bool | None = None):
         self.tools = {tool.name: tool for tool in tools}
         self.model = model
         self.max_steps = max_steps  # 防止无限循环
-        
-        # 导入 OpenAI
-        from openai import OpenAI
-        self.client = OpenAI(
+
+        base_url = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+
+        # 本地推理服务（vLLM --enable-prefix-caching 或 llama.cpp server）
+        # 会跨请求复用提示词前缀的 KV cache：第 2 步起 prefill 只需计算新增 token，
+        # 长 ReAct 轨迹上往往快 5-20 倍。
+        # 前提是消息列表"只在尾部追加、前缀不变"，所以该模式下不做历史压缩。
+        # 例: OPENAI_API_BASE=http://localhost:8000/v1
+        if prefix_cache is None:
+            prefix_cache = "localhost" in base_url or "127.0.0.1" in base_url
+        self.prefix_cache = prefix_cache
+        # cache_salt 把服务端的 KV cache 绑定到本会话，避免被其他会话驱逐/混用
+        self._session_id = uuid.uuid4().hex
+
+        # 导入 OpenAI（异步客户端）
+        # 底层用 httpx 的连接池 + HTTP/2：多步 ReAct 循环复用同一条 TLS 连接，
+        # 每步省掉一次 TCP+TLS 握手，多 Agent 并发时还能在一条连接上多路复用
+        import httpx
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI(
             api_key=os.getenv("OPENAI_API_KEY", "your-api-key"),
-            base_url=os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1"),
+            base_url=base_url,
+            http_client=httpx.AsyncClient(
+                http2=True,
+                timeout=30,
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            ),
         )
-    
-    def _build_system_prompt(self) -> str:
-        """构建系统提示词，告诉 LLM ReAct 的格式"""
-        
-        # 构建工具描述
-        tool_descriptions = "\n".join(
-            f"  - {name}: {tool.description}" 
+
+        # 工具集 init 之后不会变，工具描述块和系统提示词都构建一次缓存起来；
+        # 多次提问共享同一个字符串对象，省去每轮的拼接开销
+        self._tool_desc_block = "\n".join(
+            f"  - {name}: {tool.description}"
             for name, tool in self.tools.items()
         )
-        
+        self._system_prompt = self._make_system_prompt()
+
+    def _build_system_prompt(self) -> str:
+        """返回缓存好的系统提示词（保留方法名兼容旧用法）"""
+        return self._system_prompt
+
+    def _make_system_prompt(self) -> str:
+        """构建系统提示词，告诉 LLM ReAct 的格式"""
+
         return f"""你是一个能够使用工具解决问题的智能助手。
 
 ## 可用工具:
-{tool_descriptions}
+{self._tool_desc_block}
 
 ## 你必须严格遵循以下格式进行推理：
 
@@ -177,13 +349,27 @@ Thought: 我现在有足够的信息来回答这个问题了。
 Final Answer: [你的最终回答]
 
 ## 重要规则:
-1. 每次只能使用一个工具
-2. 必须等待 Observation 后再继续
+1. 互相独立的工具调用应该写在同一个 Thought 块里（多组 Action / Action Input 连续给出），它们会被并行执行
+2. 有依赖关系的调用（后一步需要前一步的结果）才分多轮进行，必须等待 Observation 后再继续
 3. 如果不需要工具，直接给出 Final Answer
 4. 用中文回答
 5. 思考过程要详细，展示推理逻辑"""
 
-    def run(self, question: str) -> str:
+    async def _execute_tools(self, pairs: list[tuple[str, str]]) -> list[str]:
+        """并行执行一批 (工具名, 输入) 调用，按原顺序返回观察结果"""
+
+        def _run_one(action: str, action_input: str) -> str:
+            if action in self.tools:
+                return self.tools[action].run(action_input)
+            return f"错误: 工具 '{action}' 不存在。可用工具: {', '.join(self.tools.keys())}"
+
+        loop = asyncio.get_running_loop()
+        return list(await asyncio.gather(*[
+            loop.run_in_executor(None, _run_one, action, action_input)
+            for action, action_input in pairs
+        ]))
+
+    async def run(self, question: str) -> str:
         """
         运行 ReAct 循环
         
@@ -201,54 +387,107 @@ Final Answer: [你的最终回答]
             {"role": "system", "content": self._build_system_prompt()},
             {"role": "user", "content": question}
         ]
-        
+        prior_findings: list[str] = []
+
         for step in range(self.max_steps):
             print(f"\n--- Step {step + 1} ---")
             
-            # 调用 LLM
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0,  # 推理任务用低温度
-                stop=["Observation:"],  # 在 Observation 前停止，让我们执行工具
-            )
-            
-            llm_output = response.choices[0].message.content
+            # 流式调用 LLM：边收 token 边解析
+            # 一旦收到完整的 "Action Input: xxx" 行就关闭流、立刻去执行工具，
+            # 不用等模型把剩余 token 生成完（长 Thought 时能省掉大半等待时间和输出计费）
+            extra_kwargs = {}
+            if self.prefix_cache:
+                extra_kwargs["extra_body"] = {"cache_salt": self._session_id}
+
+            # temperature=0 输出确定，可以安全地用磁盘缓存跨进程复用响应
+            cache_key = _llm_cache_key(self.model, messages)
+            llm_output = _get_llm_cache().get(cache_key)
+
+            if llm_output is None:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0,  # 推理任务用低温度
+                    stop=["Observation:"],  # 兜底：在 Observation 前停止，让我们执行工具
+                    stream=True,
+                    **extra_kwargs,
+                )
+
+                chunks = []
+                llm_output = ""
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    chunks.append(delta)
+                    llm_output = "".join(chunks)
+                    # Action Input 行之后出现空行，说明这一轮的工具调用块已经完整
+                    # （多组并行调用是连续的行，空行表示块结束），提前截断
+                    if _FINAL_TAG not in llm_output and \
+                       _ACTION_BLOCK_DONE_RE.search(llm_output):
+                        await stream.close()
+                        break
+
+                _get_llm_cache()[cache_key] = llm_output
             print(f"🤖 LLM 输出:\n{llm_output}")
             
             # 检查是否有 Final Answer
-            if "Final Answer:" in llm_output:
-                final_answer = llm_output.split("Final Answer:")[-1].strip()
+            # partition 单次扫描即可定位，不像 split 会分配整个列表
+            _, tag, final_answer = llm_output.partition(_FINAL_TAG)
+            if tag:
+                final_answer = final_answer.strip()
                 print(f"\n✅ 最终答案: {final_answer}")
                 return final_answer
-            
-            # 解析 Action 和 Action Input
-            action_match = re.search(r"Action:\s*(.+?)(?:\n|$)", llm_output)
-            action_input_match = re.search(r"Action Input:\s*(.+?)(?:\n|$)", llm_output)
-            
-            if not action_match or not action_input_match:
+
+            # 解析所有 Action / Action Input 对（一个 Thought 可以带多个独立调用）
+            pairs = _ACTION_PAIR_RE.findall(llm_output)
+            pairs = [(a.strip(), i.strip()) for a, i in pairs]
+
+            if not pairs:
                 # 没有工具调用，可能直接给了答案
                 messages.append({"role": "assistant", "content": llm_output})
                 messages.append({"role": "user", "content": "请用 'Final Answer:' 格式给出你的最终回答。"})
                 continue
-            
-            action = action_match.group(1).strip()
-            action_input = action_input_match.group(1).strip()
-            
-            print(f"\n🔧 执行工具: {action}({action_input})")
-            
-            # 执行工具
-            if action in self.tools:
-                observation = self.tools[action].run(action_input)
-            else:
-                observation = f"错误: 工具 '{action}' 不存在。可用工具: {', '.join(self.tools.keys())}"
-            
-            print(f"👁️ 观察结果: {observation}")
-            
+
+            for action, action_input in pairs:
+                print(f"\n🔧 执行工具: {action}({action_input})")
+
+            # 并行执行所有工具
+            # 工具调用是网络/IO 型延迟，并行后一轮耗时是 max(t_i) 而不是 sum(t_i)
+            observations = await self._execute_tools(pairs)
+
+            for obs in observations:
+                print(f"👁️ 观察结果: {obs}")
+
             # 将 LLM 输出和工具结果加入消息历史
+            if len(observations) == 1:
+                observation_text = f"Observation: {observations[0]}"
+            else:
+                observation_text = "\n".join(
+                    f"Observation {i}: {obs}" for i, obs in enumerate(observations, 1)
+                )
             messages.append({"role": "assistant", "content": llm_output})
-            messages.append({"role": "user", "content": f"Observation: {observation}"})
-        
+            messages.append({"role": "user", "content": observation_text})
+
+            # 滑动窗口压缩：messages = [system, 原始问题, 最近 K 轮的 (输出, 观察) 对]
+            # 被挤出窗口的轮次拼进系统提示词，模型仍能看到此前的结论。
+            # 前缀缓存模式下跳过——改写 messages[0] 会让服务端的前缀哈希失配
+            while not self.prefix_cache and len(messages) > 2 + 2 * _HISTORY_WINDOW:
+                old_output = messages.pop(2)["content"]
+                old_observation = messages.pop(2)["content"]
+                prior_findings.append(old_output)
+                prior_findings.append(old_observation)
+                messages[0] = {
+                    "role": "system",
+                    "content": (
+                        self._system_prompt
+                        + "\n\n## 此前步骤的已知结论:\n"
+                        + "\n".join(prior_findings)
+                    ),
+                }
+
         return "抱歉，我在规定步骤内没有找到答案。请尝试更简单的问题。"
 
 
@@ -390,7 +629,7 @@ if __name__ == "__main__":
                 break
             if user_input:
                 try:
-                    response = agent.run(user_input)
+                    response = asyncio.run(agent.run(user_input))
                     print(f"\n🤖 最终回答: {response}\n")
                 except Exception as e:
                     print(f"❌ 错误: {e}\n")
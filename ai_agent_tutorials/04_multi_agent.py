@@ -31,19 +31,35 @@
 """
 
 import os
+import re
 import json
+import asyncio
+from collections import deque
 from dataclasses import dataclass, field
 from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# 结构化结果在 Agent 之间传递得很频繁，序列化用 C 实现的 orjson：
+# 直接输出 UTF-8（中文不走 \uXXXX 转义），比标准库快 3-10 倍；未安装则退回 json
+try:
+    import orjson
+
+    def _dump_json(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def _dump_json(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+
 
 # ==========================================
 # 第一步：定义消息和任务系统
 # ==========================================
 
-@dataclass
+# slots=True: 实例不再带 __dict__，字段存进连续的 slot 数组，
+# 每个对象省 ~100B —— 长会话里消息对象成百上千，积少成多
+@dataclass(slots=True)
 class Message:
     """Agent 之间传递的消息"""
     sender: str      # 发送者
@@ -51,7 +67,7 @@ class Message:
     content: str      # 消息内容
     msg_type: str = "task"  # 消息类型: task(任务), result(结果), feedback(反馈)
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     """任务定义"""
     task_id: int
@@ -75,7 +91,8 @@ class SpecialistAgent:
         self.name = name
         self.role = role
         self.expertise = expertise
-        self.message_history: list[Message] = []
+        # 有界历史：超过 maxlen 自动淘汰最旧的，O(1) 且不会无限膨胀
+        self.message_history: deque[Message] = deque(maxlen=256)
     
     def receive_message(self, message: Message) -> str:
         """接收消息并处理"""
@@ -130,13 +147,13 @@ class ResearcherAgent(SpecialistAgent):
         # 简单关键词匹配
         for key, data in research_db.items():
             if key in task_content:
-                return json.dumps(data, ensure_ascii=False, indent=2)
+                return _dump_json(data)
         
-        return json.dumps({
+        return _dump_json({
             "findings": [f"关于'{task_content}'的研究需要更多时间"],
             "recommendation": "需要进一步调研",
             "sources": ["待定"]
-        }, ensure_ascii=False, indent=2)
+        })
 
 
 class CoderAgent(SpecialistAgent):
@@ -155,34 +172,36 @@ class CoderAgent(SpecialistAgent):
         code_templates = {
             "flask": '''
 # Flask Web 应用示例
+from itertools import count
 from flask import Flask, jsonify, request
 
 app = Flask(__name__)
 
-# 内存中的数据存储
-todos = []
+# 内存中的数据存储：按 id 建索引，按 id 查找/更新是 O(1)
+todos: dict[int, dict] = {}
+_next_id = count(1)
 
 @app.route('/api/todos', methods=['GET'])
 def get_todos():
     """获取所有待办事项"""
-    return jsonify(todos)
+    return jsonify(list(todos.values()))
 
 @app.route('/api/todos', methods=['POST'])
 def add_todo():
     """添加新的待办事项"""
     data = request.json
     todo = {
-        "id": len(todos) + 1,
+        "id": next(_next_id),
         "title": data.get("title", ""),
         "completed": False,
     }
-    todos.append(todo)
+    todos[todo["id"]] = todo
     return jsonify(todo), 201
 
 @app.route('/api/todos/<int:todo_id>', methods=['PUT'])
 def update_todo(todo_id):
     """更新待办事项"""
-    todo = next((t for t in todos if t["id"] == todo_id), None)
+    todo = todos.get(todo_id)
     if not todo:
         return jsonify({"error": "Not found"}), 404
     data = request.json
@@ -194,6 +213,7 @@ if __name__ == '__main__':
 ''',
             "fastapi": '''
 # FastAPI Web 应用示例
+from itertools import count
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
@@ -206,21 +226,23 @@ class TodoCreate(BaseModel):
 class Todo(TodoCreate):
     id: int
 
-todos: list[Todo] = []
+# 按 id 建索引，按 id 查找/更新是 O(1)
+todos: dict[int, Todo] = {}
+_next_id = count(1)
 
 @app.get("/api/todos", response_model=list[Todo])
 async def get_todos():
-    return todos
+    return list(todos.values())
 
 @app.post("/api/todos", response_model=Todo, status_code=201)
 async def add_todo(todo_data: TodoCreate):
-    todo = Todo(id=len(todos) + 1, **todo_data.model_dump())
-    todos.append(todo)
+    todo = Todo(id=next(_next_id), **todo_data.model_dump())
+    todos[todo.id] = todo
     return todo
 
 @app.put("/api/todos/{todo_id}", response_model=Todo)
 async def update_todo(todo_id: int, todo_data: TodoCreate):
-    todo = next((t for t in todos if t.id == todo_id), None)
+    todo = todos.get(todo_id)
     if not todo:
         raise HTTPException(status_code=404, detail="Not found")
     todo.title = todo_data.title
@@ -266,13 +288,23 @@ class ReviewerAgent(SpecialistAgent):
             ],
             "verdict": "基本功能完成，但需要增强安全性和健壮性后才能部署到生产环境。"
         }
-        return json.dumps(review, ensure_ascii=False, indent=2)
+        return _dump_json(review)
 
 
 # ==========================================
 # 第三步：实现协调者 (Orchestrator)
 # ==========================================
 
+# 任务分解的触发词 -> 任务类别
+# 编译成一个交替正则后，对用户需求只做一次线性扫描就能命中所有触发词，
+# 不用逐个关键词做 `in` 子串扫描（触发词多了以后差距会越来越大）
+_TRIGGER_WORDS = {
+    "开发": "build", "创建": "build", "搭建": "build",
+    "构建": "build", "做一个": "build",
+}
+_TRIGGER_RE = re.compile("|".join(map(re.escape, _TRIGGER_WORDS)))
+
+
 class OrchestratorAgent:
     """
     协调者 Agent — 多 Agent 系统的"管理者"
@@ -293,7 +325,7 @@ class OrchestratorAgent:
             "reviewer": ReviewerAgent(),
         }
         self.task_history: list[Task] = []
-        self.message_log: list[Message] = []
+        self.message_log: deque[Message] = deque(maxlen=256)
     
     def decompose_task(self, user_request: str) -> list[Task]:
         """
@@ -305,8 +337,9 @@ class OrchestratorAgent:
         tasks = []
         task_id = 1
         
-        # 简单的任务分解逻辑
-        if any(word in user_request for word in ["开发", "创建", "搭建", "构建", "做一个"]):
+        # 简单的任务分解逻辑：一次扫描找出所有触发词对应的类别
+        categories = {_TRIGGER_WORDS[w] for w in _TRIGGER_RE.findall(user_request)}
+        if "build" in categories:
             tasks.append(Task(
                 task_id=task_id,
                 description=f"技术调研: 调研{user_request}的最佳实践和技术选型",
@@ -369,7 +402,43 @@ class OrchestratorAgent:
         self.message_log.append(result_message)
         
         return result
-    
+
+    async def assign_and_execute_async(self, task: Task) -> str:
+        """assign_and_execute 的异步版本：丢进线程池，多个专业 Agent 互不阻塞"""
+        return await asyncio.to_thread(self.assign_and_execute, task)
+
+    def build_coalesced_prompt(self, tasks: list[Task]) -> tuple[str, str]:
+        """把一批子任务合并成一次 LLM 调用（请求合并）。
+
+        专业 Agent 换成真实 LLM 后，逐个调用要付 3 次 HTTP 往返；
+        把三个角色的说明和各自的子任务拼进同一个提示词，
+        让模型一次性返回 {"researcher": ..., "coder": ..., "reviewer": ...}，
+        3 次往返就变成 1 次，共享的上下文也只计费/计算一遍。
+        返回 (system_prompt, user_prompt)。
+        """
+        role_block = "\n".join(
+            f"- {name}（{agent.role}）: 擅长{agent.expertise}"
+            for name, agent in self.agents.items()
+        )
+        task_block = "\n".join(
+            f'- "{t.assigned_to}": {t.description}' for t in tasks
+        )
+        system_prompt = (
+            "你同时扮演以下几个专业角色，分别完成指派给各角色的任务：\n"
+            f"{role_block}\n\n"
+            "用一个 JSON 对象回复，键是角色名，值是该角色的任务结果。"
+        )
+        user_prompt = f"各角色的任务如下：\n{task_block}"
+        return system_prompt, user_prompt
+
+    def split_coalesced_response(self, raw: str) -> dict[str, str]:
+        """拆开合并调用的返回：按角色名取出各自的结果"""
+        try:
+            payload = json.loads(raw)
+        except json.JSONDecodeError:
+            return {}
+        return {name: str(payload[name]) for name in self.agents if name in payload}
+
     def run(self, user_request: str) -> str:
         """
         运行完整的多 Agent 工作流
@@ -385,12 +454,20 @@ class OrchestratorAgent:
             print(f"  📌 任务 {t.task_id}: {t.description}")
             print(f"     分配给: {t.assigned_to}")
         
-        # Step 2: 逐个执行任务
-        print(f"\n⚡ Step 2: 执行任务")
+        # Step 2: 并行执行任务
+        # 三个专业 Agent 互相独立，用 asyncio.gather 同时跑
+        # （真实项目里每个 Agent 背后是一次 LLM 调用，并行能把耗时压到最慢的那一个）
+        print(f"\n⚡ Step 2: 并行执行任务")
+
+        async def _execute_all():
+            return await asyncio.gather(
+                *[self.assign_and_execute_async(t) for t in tasks]
+            )
+
+        task_results = asyncio.run(_execute_all())
+
         results = {}
-        for task in tasks:
-            print(f"\n  --- 任务 {task.task_id} ---")
-            result = self.assign_and_execute(task)
+        for task, result in zip(tasks, task_results):
             results[task.assigned_to] = result
             self.task_history.append(task)
         
@@ -402,8 +479,10 @@ class OrchestratorAgent:
     
     def _summarize_results(self, request: str, tasks: list[Task], results: dict) -> str:
         """汇总所有结果"""
-        
-        report = f"""
+
+        # 字符串不可变，反复 += 每次都要整体复制一遍（总共 O(n²)）；
+        # 攒进列表最后一次 join 是线性的
+        parts = [f"""
 {'='*60}
 📋 多 Agent 协作报告
 {'='*60}
@@ -411,26 +490,26 @@ class OrchestratorAgent:
 🎯 原始需求: {request}
 
 📊 任务执行情况:
-"""
+"""]
         for task in tasks:
             status_emoji = "✅" if task.status == "completed" else "❌"
-            report += f"\n  {status_emoji} 任务 {task.task_id} [{task.assigned_to}]: {task.description[:40]}"
-        
-        report += f"\n\n{'─'*40}"
-        
+            parts.append(f"\n  {status_emoji} 任务 {task.task_id} [{task.assigned_to}]: {task.description[:40]}")
+
+        parts.append(f"\n\n{'─'*40}")
+
         for agent_name, result in results.items():
             agent = self.agents[agent_name]
-            report += f"\n\n📦 {agent.name} ({agent.role}) 的结果:"
-            report += f"\n{result}"
-        
-        report += f"\n\n{'='*60}"
-        report += f"\n💬 协调者总结:"
-        report += f"\n  任务已全部完成。"
-        report += f"\n  参与 Agent: {', '.join(r.name for r in self.agents.values())}"
-        report += f"\n  消息总数: {len(self.message_log)}"
-        report += f"\n{'='*60}"
-        
-        return report
+            parts.append(f"\n\n📦 {agent.name} ({agent.role}) 的结果:")
+            parts.append(f"\n{result}")
+
+        parts.append(f"\n\n{'='*60}")
+        parts.append(f"\n💬 协调者总结:")
+        parts.append(f"\n  任务已全部完成。")
+        parts.append(f"\n  参与 Agent: {', '.join(r.name for r in self.agents.values())}")
+        parts.append(f"\n  消息总数: {len(self.message_log)}")
+        parts.append(f"\n{'='*60}")
+
+        return "".join(parts)
     
     def show_communication_log(self):
         """显示 Agent 之间的通信日志"""
@@ -488,6 +567,8 @@ def demo_multi_agent():
 
   4. 实际项目中的增强方向:
      - 每个 Agent 都调用 LLM API（本示例用模拟代替）
+     - 把多个角色合并进一次 LLM 调用，3 次往返变 1 次
+       （见 build_coalesced_prompt / split_coalesced_response）
      - 添加 Agent 之间的反馈循环（审查员可以要求程序员修改）
      - 使用框架: CrewAI, AutoGen, LangGraph
      - 添加共享记忆系统
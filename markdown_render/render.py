@@ -22,10 +22,13 @@ Markdown to WeChat-style HTML Renderer
     默认: input.md -> input.html
 """
 
+import os
 import re
 import sys
-import html as html_module
+import glob
 import base64
+import hashlib
+import functools
 
 # ============================================================
 # 主题配置 - 修改此处可全局更换主题色
@@ -165,6 +168,9 @@ STYLES = {
     ),
 }
 
+# 代码块渲染结果缓存（按语言+内容；见 _parse_code_block）
+_CODE_BLOCK_CACHE: dict[tuple[str, str], str] = {}
+
 # Mac 风格代码块装饰
 MAC_DOTS_SVG = (
     '<span style="display: flex; padding: 10px 14px 0;">'
@@ -179,87 +185,376 @@ MAC_DOTS_SVG = (
 )
 
 
+# ============================================================
+# 预生成标签常量 - 样式是不可变常量，完整的开/闭标签在模块
+# 加载时拼好一次，逐元素输出时省掉字典查找和 f-string 格式化
+# ============================================================
+TAG_OPEN = {
+    tag: f'<{tag} style="{STYLES[tag]}">'
+    for tag in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol', 'li')
+}
+TAG_CLOSE = {tag: f'</{tag}>' for tag in TAG_OPEN}
+_P_OPEN = TAG_OPEN['p']
+_UL_OPEN = TAG_OPEN['ul']
+_OL_OPEN = TAG_OPEN['ol']
+_LI_OPEN = TAG_OPEN['li']
+_HR_HTML = f'<hr style="{STYLES["hr"]}">'
+_SECTION_OPEN = f'<section class="container" style="{STYLES["container"]}">\n'
+_TH_OPEN = f'<th style="{STYLES["th"]}">'
+_TD_OPEN = f'<td style="{STYLES["td"]}">'
+_PRE_OPEN = f'<pre style="{STYLES["code_block"]}">' + MAC_DOTS_SVG
+_CODE_INNER_STYLE = f'" style="{STYLES["code_inner"]}">'
+_TABLE_WRAP_STYLE = (
+    f"font-family: {FONT_FAMILY}; font-size: 16px; line-height: 1.75; "
+    f"text-align: left; max-width: 100%; overflow: auto;"
+)
+_THEAD_STYLE = f"font-weight: bold; color: {TEXT_COLOR};"
+
+# --classes 模式：同一套样式改成 class 引用 + 单个 <style> 块。
+# 每个元素只带十几字节的 class 名，不再逐个重复整段样式，长文档
+# 输出体积能缩小一个数量级。微信编辑器会剥掉 <style>，因此内联
+# 输出仍是默认；网页发布/本地预览可用 --classes
+_ALL_CLASS_STYLES = {
+    **STYLES,
+    'h1-first': STYLES['h1'] + ' margin-top: 0 !important;',
+    'table-wrap': _TABLE_WRAP_STYLE,
+    'thead': _THEAD_STYLE,
+}
+_STYLE_TO_CLASS = {css: f'md-{name}' for name, css in _ALL_CLASS_STYLES.items()}
+_CLASS_CSS = '\n'.join(
+    f'.md-{name} {{ {css} }}' for name, css in _ALL_CLASS_STYLES.items()
+)
+_STYLE_ATTR_RE = re.compile(r'style="([^"]*)"')
+
+
+# ============================================================
+# 预编译正则 - 模块加载时编译一次，逐行解析时直接复用
+# （省掉每行 6~8 次 re 模块缓存查找和模式哈希）
+# ============================================================
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*)')
+_FENCE_LANG_RE = re.compile(r'```(\w*)')
+_TABLE_SEP_RE = re.compile(r'\|[\s\-:|]+\|\s*$')
+_BQ_PREFIX_RE = re.compile(r'^>\s?')
+_BQ_NESTED_RE = re.compile(r'^>', re.MULTILINE)
+_UL_START_RE = re.compile(r'^(\s*)[-*+]\s')
+_UL_ITEM_RE = re.compile(r'^(\s*)[-*+]\s+(.*)')
+_OL_START_RE = re.compile(r'^(\s*)\d+\.\s')
+_OL_ITEM_RE = re.compile(r'^(\s*)\d+\.\s+(.*)')
+_INDENT_RE = re.compile(r'^(\s*)')
+_FENCE_CLOSE_RE = re.compile(r'\s*```\s*$')
+_LEAD_SPACES_RE = re.compile(r'^( +)', re.MULTILINE)
+_MATH_CLOSE_RE = re.compile(r'\s*\$\$\s*$')
+
+
+def _first_nonspace(line: str) -> int:
+    """首个非空白字符的下标（没有 strip() 的临时字符串分配）"""
+    i = 0
+    n = len(line)
+    while i < n and (line[i] == ' ' or line[i] == '\t'):
+        i += 1
+    return i
+
+
+# 块级类型判定融合成一条带命名分组的交替式：每行一次 C 层匹配，
+# 代替 Python 层 6~8 次独立的 match/startswith 判断
+# （各分支的前导空白规则与原先的逐项判断逐一对应，交替顺序即优先级）
+_BLOCK_RE = re.compile(
+    r'(?P<heading>#{1,6}\s)'
+    r'|(?P<fence>\s*```)'
+    r'|(?P<math>\s*\$\$)'
+    r'|(?P<table>\s*\|)'
+    r'|(?P<quote>\s*>)'
+    r'|(?P<ul>\s*[-*+]\s)'
+    r'|(?P<ol>\s*\d+\.\s)'
+    r'|(?P<hr>\s*(?:-{3,}|\*{3,}|_{3,})\s*$)'
+    r'|(?P<html>\s*<(?!!\[))'
+)
+
+
 # ============================================================
 # 辅助函数
 # ============================================================
-def escape(text: str) -> str:
-    """HTML 转义，但保留已有的 HTML 标签不转义。"""
-    return html_module.escape(text)
+# html.escape 内部是 4 次连续的 str.replace，每次都分配新字符串；
+# translate 表让 C 层单趟扫描完成全部替换，只分配一次
+# （映射与 html.escape(quote=True) 完全一致）
+_HTML_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;", "<": "&lt;", ">": "&gt;",
+    '"': "&quot;", "'": "&#x27;",
+})
 
 
-def render_inline(text: str) -> str:
-    """处理行内 Markdown 元素：粗体、斜体、删除线、行内代码、链接、图片、行内公式。"""
-    # 行内代码（最先处理，避免内容被其他规则干扰）
-    def replace_code(m):
-        code = escape(m.group(1))
-        code = code.replace('$', '&#36;')  # 防止 $ 泄漏到 LaTeX 正则
-        return f'<code style="{STYLES["codespan"]}">{code}</code>'
-    text = re.sub(r'`([^`]+)`', replace_code, text)
-
-    # 图片
-    def replace_img(m):
-        alt, src = m.group(1), m.group(2)
-        return (
-            f'<figure style="margin: 1.5em 8px; color: {TEXT_COLOR};">'
-            f'<img src="{src}" alt="{escape(alt)}" style="{STYLES["img"]}">'
-            f'<figcaption style="{STYLES["figcaption"]}">{escape(alt)}</figcaption>'
-            f'</figure>'
-        )
-    text = re.sub(r'!\[([^\]]*)\]\(([^)]+)\)', replace_img, text)
-
-    # 链接
-    def replace_link(m):
-        label, href = m.group(1), m.group(2)
-        return (
-            f'<a href="{href}" title="{escape(label)}" '
-            f'style="{STYLES["link"]}">{label}</a>'
-        )
-    text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', replace_link, text)
+@functools.lru_cache(maxsize=8192)
+def _escape_cached(text: str) -> str:
+    return text.translate(_HTML_ESCAPE_TABLE)
 
-    # 行内 LaTeX 公式 $...$
-    def replace_inline_math(m):
-        formula = m.group(1)
-        encoded = base64.b64encode(formula.encode('utf-8')).decode('ascii')
-        display = escape(formula)
-        return (
-            f'<span class="katex-inline-render" data-formula-b64="{encoded}" '
-            f'style="max-width: 100%; overflow-x: auto;">'
-            f'<code style="font-style: italic; color: {THEME_COLOR};">{display}</code>'
-            f'</span>'
-        )
-    text = re.sub(r'(?<!\$)\$([^\$]+?)\$(?!\$)', replace_inline_math, text)
-
-    # 粗斜体 ***text*** 或 ___text___
-    text = re.sub(
-        r'\*\*\*(.+?)\*\*\*|___(.+?)___',
-        lambda m: (
-            f'<strong style="{STYLES["strong"]}">'
-            f'<em style="{STYLES["em"]}">{m.group(1) or m.group(2)}</em></strong>'
-        ),
-        text,
+
+def escape(text: str) -> str:
+    """HTML 转义，但保留已有的 HTML 标签不转义。
+
+    短字符串（代码标识符、表格单元格等）在一篇文档里大量重复，
+    用 LRU 缓存记住转义结果；超长字符串直接转义，避免把缓存撑爆。
+    """
+    if len(text) > 256:
+        return text.translate(_HTML_ESCAPE_TABLE)
+    return _escape_cached(text)
+
+
+# base64 编码器绑定成模块局部名，省掉每个公式一次 base64.b64encode 属性链查找
+_b64encode = base64.b64encode
+
+# 行内元素的正则与替换函数都提升到模块级：
+# render_inline 每个段落/单元格都要跑一遍，编译对象和替换函数
+# 只建一次，不再每次调用都重建闭包、重查 re 模块缓存
+_RE_CODE = re.compile(r'`([^`]+)`')
+_RE_IMG = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)')
+_RE_LINK = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')
+_RE_MATH = re.compile(r'(?<!\$)\$([^\$]+?)\$(?!\$)')
+_RE_BOLDITAL = re.compile(r'\*\*\*(.+?)\*\*\*|___(.+?)___')
+_RE_BOLD = re.compile(r'\*\*(.+?)\*\*|__(.+?)__')
+_RE_ITAL = re.compile(r'(?<!\*)\*([^\*]+?)\*(?!\*)|(?<!_)_([^_]+?)_(?!_)')
+_RE_STRIKE = re.compile(r'~~(.+?)~~')
+
+
+def _replace_code(m):
+    code = escape(m.group(1))
+    code = code.replace('$', '&#36;')  # 防止 $ 泄漏到 LaTeX 正则
+    return f'<code style="{STYLES["codespan"]}">{code}</code>'
+
+
+def _replace_img(m):
+    alt, src = m.group(1), m.group(2)
+    return (
+        f'<figure style="margin: 1.5em 8px; color: {TEXT_COLOR};">'
+        f'<img src="{src}" alt="{escape(alt)}" style="{STYLES["img"]}">'
+        f'<figcaption style="{STYLES["figcaption"]}">{escape(alt)}</figcaption>'
+        f'</figure>'
     )
 
-    # 粗体 **text** 或 __text__
-    text = re.sub(
-        r'\*\*(.+?)\*\*|__(.+?)__',
-        lambda m: (
-            f'<strong style="{STYLES["strong"]}">{m.group(1) or m.group(2)}</strong>'
-        ),
-        text,
+
+def _replace_link(m):
+    label, href = m.group(1), m.group(2)
+    return (
+        f'<a href="{href}" title="{escape(label)}" '
+        f'style="{STYLES["link"]}">{label}</a>'
     )
 
-    # 斜体 *text* 或 _text_
-    text = re.sub(
-        r'(?<!\*)\*([^\*]+?)\*(?!\*)|(?<!_)_([^_]+?)_(?!_)',
-        lambda m: (
-            f'<em style="{STYLES["em"]}">{m.group(1) or m.group(2)}</em>'
-        ),
-        text,
+
+def _replace_inline_math(m):
+    formula = m.group(1)
+    encoded = _b64encode(formula.encode('utf-8')).decode('ascii')
+    display = escape(formula)
+    return (
+        f'<span class="katex-inline-render" data-formula-b64="{encoded}" '
+        f'style="max-width: 100%; overflow-x: auto;">'
+        f'<code style="font-style: italic; color: {THEME_COLOR};">{display}</code>'
+        f'</span>'
     )
 
+
+def _replace_bold_italic(m):
+    return (
+        f'<strong style="{STYLES["strong"]}">'
+        f'<em style="{STYLES["em"]}">{m.group(1) or m.group(2)}</em></strong>'
+    )
+
+
+def _replace_bold(m):
+    return f'<strong style="{STYLES["strong"]}">{m.group(1) or m.group(2)}</strong>'
+
+
+def _replace_italic(m):
+    return f'<em style="{STYLES["em"]}">{m.group(1) or m.group(2)}</em>'
+
+
+# 行内渲染默认走单趟扫描器；设为 False 可切回原来的 8 趟正则管线做 A/B 对比
+USE_INLINE_SCANNER = True
+
+# 扫描器可能触发的特殊字符集合；整行都不含这些字符时直接原样返回
+# （set.isdisjoint 对字符串的遍历在 C 层完成，普通文字行几乎零开销）
+_INLINE_SPECIALS = frozenset('`![$*_~')
+
+# 扫描器热循环里用到的固定片段，预先拼好（循环内零字典查找）
+_CODESPAN_OPEN = f'<code style="{STYLES["codespan"]}">'
+_EM_OPEN = f'<em style="{STYLES["em"]}">'
+_STRONG_OPEN = f'<strong style="{STYLES["strong"]}">'
+_STRONG_EM_OPEN = _STRONG_OPEN + _EM_OPEN
+
+
+def _scan_inline(text: str) -> str:
+    """单趟从左到右的行内扫描器
+
+    正则管线每个构造都要全文重写一遍（8 趟），且 `\*\*(.+?)\*\*`
+    这类回溯正则在恶意输入下是最坏平方级；扫描器对每个字符只
+    判定一次，字面量区间整段切片输出，嵌套内容递归处理。
+    """
+    out = []
+    append = out.append
+    find = text.find  # 绑定成局部名：循环里走 LOAD_FAST
+    n = len(text)
+    i = 0
+    start = 0  # 当前字面量区间的起点
+    while i < n:
+        c = text[i]
+
+        # 行内代码 `code`
+        if c == '`':
+            j = find('`', i + 1)
+            if j > i + 1:
+                append(text[start:i])
+                code = escape(text[i + 1:j]).replace('$', '&#36;')
+                append(f'{_CODESPAN_OPEN}{code}</code>')
+                i = j + 1
+                start = i
+                continue
+
+        # 图片 ![alt](src)
+        elif c == '!' and text.startswith('![', i):
+            j = find(']', i + 2)
+            if j != -1 and text.startswith('(', j + 1):
+                k = find(')', j + 2)
+                if k > j + 2:
+                    alt, src_url = text[i + 2:j], text[j + 2:k]
+                    append(text[start:i])
+                    append(
+                        f'<figure style="margin: 1.5em 8px; color: {TEXT_COLOR};">'
+                        f'<img src="{src_url}" alt="{escape(alt)}" style="{STYLES["img"]}">'
+                        f'<figcaption style="{STYLES["figcaption"]}">{escape(alt)}</figcaption>'
+                        f'</figure>'
+                    )
+                    i = k + 1
+                    start = i
+                    continue
+
+        # 链接 [label](href)
+        elif c == '[':
+            j = find(']', i + 1)
+            if j > i + 1 and text.startswith('(', j + 1):
+                k = find(')', j + 2)
+                if k > j + 2:
+                    label, href = text[i + 1:j], text[j + 2:k]
+                    append(text[start:i])
+                    append(
+                        f'<a href="{href}" title="{escape(label)}" '
+                        f'style="{STYLES["link"]}">{label}</a>'
+                    )
+                    i = k + 1
+                    start = i
+                    continue
+
+        # 行内公式 $...$（排除 $$）
+        elif c == '$':
+            j = find('$', i + 1)
+            if (j > i + 1 and not text.startswith('$', j + 1)
+                    and not (i > 0 and text[i - 1] == '$')):
+                formula = text[i + 1:j]
+                append(text[start:i])
+                encoded = _b64encode(formula.encode('utf-8')).decode('ascii')
+                append(
+                    f'<span class="katex-inline-render" data-formula-b64="{encoded}" '
+                    f'style="max-width: 100%; overflow-x: auto;">'
+                    f'<code style="font-style: italic; color: {THEME_COLOR};">'
+                    f'{escape(formula)}</code></span>'
+                )
+                i = j + 1
+                start = i
+                continue
+
+        # 粗体/斜体/粗斜体：按分隔符连击长度（1/2/3）配对
+        elif c == '*' or c == '_':
+            run = 1
+            while run < 3 and i + run < n and text[i + run] == c:
+                run += 1
+            marker = c * run
+            j = find(marker, i + run)
+            if j > i + run:
+                inner = _scan_inline(text[i + run:j])
+                append(text[start:i])
+                if run == 3:
+                    append(f'{_STRONG_EM_OPEN}{inner}</em></strong>')
+                elif run == 2:
+                    append(f'{_STRONG_OPEN}{inner}</strong>')
+                else:
+                    # 单分隔符要求闭合符后面不再跟同字符（区分 *a* 与 *a**）
+                    if text.startswith(c, j + 1) or c in inner:
+                        i += run
+                        out.pop()  # 撤销已写出的字面量段
+                        continue
+                    append(f'{_EM_OPEN}{inner}</em>')
+                i = j + run
+                start = i
+                continue
+            i += run
+            continue
+
+        # 删除线 ~~text~~
+        elif c == '~' and text.startswith('~~', i):
+            j = find('~~', i + 2)
+            if j > i + 2:
+                append(text[start:i])
+                append(f'<del>{_scan_inline(text[i + 2:j])}</del>')
+                i = j + 2
+                start = i
+                continue
+
+        i += 1
+
+    append(text[start:])
+    return ''.join(out)
+
+
+def render_inline(text: str) -> str:
+    """处理行内 Markdown 元素：粗体、斜体、删除线、行内代码、链接、图片、行内公式。"""
+    if _INLINE_SPECIALS.isdisjoint(text):
+        return text  # 纯文字行：没有任何行内语法，原样返回
+    if USE_INLINE_SCANNER:
+        return _scan_inline(text)
+    return _render_inline_regex(text)
+
+
+def _render_inline_regex(text: str) -> str:
+    """原 8 趟 re.sub 管线（保留用于 A/B 校验与回退）。
+
+    每趟之前先做一次 C 级子串探测：这段文字里根本没有对应
+    语法字符时，整趟 re.sub 直接跳过——典型文本只含一两种
+    行内语法，一半以上的趟次不用进正则引擎。
+
+    行内代码先抽成占位符、最后放回：反引号里的内容是字面量
+    （CommonMark 语义，扫描器也这么做），`**粗体**` 这类写法
+    不能被后面的强调趟次二次渲染。旧版只是把代码趟排在最前，
+    生成的 <code> 内容仍会被强调正则命中，与扫描器的输出不一致。
+    """
+    # 行内代码：渲染结果暂存，替换成 \x00 包裹的占位符
+    # （\x00 不会出现在正常文本里，也不含任何行内语法字符）
+    code_spans: list[str] = []
+    if '`' in text:
+        def _stash_code(m):
+            code_spans.append(_replace_code(m))
+            return f'\x00{len(code_spans) - 1}\x00'
+        text = _RE_CODE.sub(_stash_code, text)
+
+    # 图片 / 链接
+    if '[' in text:
+        if '![' in text:
+            text = _RE_IMG.sub(_replace_img, text)
+        text = _RE_LINK.sub(_replace_link, text)
+
+    # 行内 LaTeX 公式 $...$
+    if '$' in text:
+        text = _RE_MATH.sub(_replace_inline_math, text)
+
+    # 粗斜体 / 粗体 / 斜体（*** ** * 或 ___ __ _）
+    if '*' in text or '_' in text:
+        text = _RE_BOLDITAL.sub(_replace_bold_italic, text)
+        text = _RE_BOLD.sub(_replace_bold, text)
+        text = _RE_ITAL.sub(_replace_italic, text)
+
     # 删除线 ~~text~~
-    text = re.sub(r'~~(.+?)~~', r'<del>\1</del>', text)
+    if '~~' in text:
+        text = _RE_STRIKE.sub(r'<del>\1</del>', text)
 
+    # 把代码片段放回占位符的位置
+    for idx, span in enumerate(code_spans):
+        text = text.replace(f'\x00{idx}\x00', span)
     return text
 
 
@@ -269,23 +564,53 @@ def render_inline(text: str) -> str:
 class MarkdownRenderer:
     """简易 Markdown -> 内联样式 HTML 渲染器"""
 
+    # 固定属性集：实例不再带 __dict__，self.pos / self.lines 这类
+    # 每行都要碰好几次的属性访问从字典查找变成偏移量读取
+    __slots__ = ('lines', 'pos', 'output', '_needs_sep')
+
     def __init__(self):
         self.lines: list[str] = []
         self.pos = 0
         self.output: list[str] = []
+        self._needs_sep = False  # 下一个块之前是否要补换行分隔符
 
     def render(self, md_text: str) -> str:
         self.lines = md_text.split('\n')
         self.pos = 0
         self.output = []
+        self._needs_sep = False
         self._parse_blocks()
-        body = '\n'.join(self.output)
+        body = ''.join(self.output)
 
-        return (
-            f'<section class="container" style="{STYLES["container"]}">\n'
-            f'{body}\n'
-            f'</section>'
-        )
+        return f'{_SECTION_OPEN}{body}\n</section>'
+
+    def render_to(self, md_text: str, sink, tee=None):
+        """流式渲染：HTML 片段攒够一批就写入 sink，不在内存保留整篇正文
+
+        大文档不再出现"完整正文 + 完整页面"两份拷贝；sink 也可以是
+        sys.stdout，方便管道使用。tee 可选，同样的内容同步多写一份
+        （用于边渲染边落磁盘缓存）。
+        """
+        self.lines = md_text.split('\n')
+        self.pos = 0
+        self.output = []
+        self._needs_sep = False
+
+        def flush():
+            chunk = ''.join(self.output)
+            self.output.clear()
+            sink.write(chunk)
+            if tee is not None:
+                tee.write(chunk)
+
+        self.output.append(_SECTION_OPEN)
+        n = len(self.lines)
+        while self.pos < n:
+            self._parse_one_block()
+            if len(self.output) >= 512:
+                flush()
+        self.output.append('\n</section>')
+        flush()
 
     def _peek(self) -> str | None:
         if self.pos < len(self.lines):
@@ -297,92 +622,99 @@ class MarkdownRenderer:
         self.pos += 1
         return line
 
-    def _parse_blocks(self):
-        while self.pos < len(self.lines):
-            line = self._peek()
-            if line is None:
-                break
-
-            # 空行
-            if line.strip() == '':
-                self._advance()
-                continue
-
-            # 首个 h1 去除 margin-top
-            # 标题
-            if re.match(r'^#{1,6}\s', line):
-                self._parse_heading()
-                continue
-
-            # 代码块
-            if line.strip().startswith('```'):
-                self._parse_code_block()
-                continue
-
-            # 块级公式 $$
-            if line.strip().startswith('$$'):
-                self._parse_math_block()
-                continue
+    # ---------- 输出缓冲 ----------
+    # output 当作"绳索"（rope）用：HTML 片段直接 extend 进去，
+    # 最后 render() 一次 join —— 不再为每个块先拼一个中间大字符串
+    def _emit_block(self, *parts):
+        """开始一个新块并写入片段；块与块之间补换行，与旧输出格式一致。
 
-            # 表格 (|开头)
-            if line.strip().startswith('|'):
-                self._parse_table()
-                continue
+        分隔符由 _needs_sep 标志控制（不能看 output 是否为空：
+        流式模式下缓冲随时会被冲刷清空）。
+        """
+        if self._needs_sep:
+            self.output.append('\n')
+        self._needs_sep = True
+        self.output.extend(parts)
+
+    def _emit_block_lines(self, parts):
+        """写入一个由多"行"组成的块，行间补换行（等价于原先的 '\n'.join）。"""
+        if self._needs_sep:
+            self.output.append('\n')
+        self._needs_sep = True
+        out = self.output
+        append = out.append
+        append(parts[0])
+        for part in parts[1:]:
+            append('\n')
+            append(part)
+
+    # 命中的分组名 -> 对应的块解析方法
+    _DISPATCH = {
+        'heading': '_parse_heading',
+        'fence': '_parse_code_block',
+        'math': '_parse_math_block',
+        'table': '_parse_table',
+        'quote': '_parse_blockquote',
+        'ul': '_parse_list',
+        'ol': '_parse_list',
+        'hr': '_parse_hr',
+        'html': '_parse_html_block',
+    }
 
-            # 引用
-            if line.strip().startswith('>'):
-                self._parse_blockquote()
-                continue
+    def _parse_blocks(self):
+        while self.pos < len(self.lines):
+            self._parse_one_block()
 
-            # 无序列表
-            if re.match(r'^(\s*)[-*+]\s', line):
-                self._parse_unordered_list()
-                continue
+    def _parse_one_block(self):
+        line = self._peek()
+        if line is None:
+            return
 
-            # 有序列表
-            if re.match(r'^(\s*)\d+\.\s', line):
-                self._parse_ordered_list()
-                continue
+        # 空行
+        if not line or line.isspace():
+            self._advance()
+            return
 
-            # 分割线
-            if re.match(r'^(-{3,}|\*{3,}|_{3,})\s*$', line.strip()):
-                self._advance()
-                self.output.append(f'<hr style="{STYLES["hr"]}">')
-                continue
+        # 一次匹配判定所有块级类型，按命中的分组名分发
+        m = _BLOCK_RE.match(line)
+        if m:
+            getattr(self, self._DISPATCH[m.lastgroup])()
+            return
 
-            # HTML 透传（以 < 开头且不是 markdown 语法）
-            if line.strip().startswith('<') and not line.strip().startswith('<!['):
-                self._parse_html_block()
-                continue
+        # 普通段落
+        self._parse_paragraph()
 
-            # 普通段落
-            self._parse_paragraph()
+    # ---------- 分割线 ----------
+    def _parse_hr(self):
+        self._advance()
+        self._emit_block(_HR_HTML)
 
     # ---------- 标题 ----------
     def _parse_heading(self):
         line = self._advance()
-        m = re.match(r'^(#{1,6})\s+(.*)', line)
+        m = _HEADING_RE.match(line)
         if not m:
             return
         level = len(m.group(1))
         content = render_inline(m.group(2))
         tag = f'h{level}'
-        style = STYLES.get(tag, STYLES["h6"])
-        # 第一个 h1 去除 margin-top
+        # 第一个 h1 去除 margin-top（样式是动态的，单独拼接）
         if tag == 'h1' and not any('class="h1"' in o for o in self.output):
-            style += " margin-top: 0 !important;"
-        self.output.append(f'<{tag} style="{style}">{content}</{tag}>')
+            style = STYLES["h1"] + " margin-top: 0 !important;"
+            self._emit_block(f'<h1 style="{style}">', content, '</h1>')
+        else:
+            self._emit_block(TAG_OPEN[tag], content, TAG_CLOSE[tag])
 
     # ---------- 代码块 ----------
     def _parse_code_block(self):
         line = self._advance()
-        m = re.match(r'^```(\w*)', line.strip())
+        m = _FENCE_LANG_RE.match(line, _first_nonspace(line))
         lang = m.group(1) if m else ''
         code_lines = []
 
         while self.pos < len(self.lines):
             line = self._advance()
-            if line.strip() == '```':
+            if _FENCE_CLOSE_RE.match(line):
                 break
             code_lines.append(line)
 
@@ -393,17 +725,22 @@ class MarkdownRenderer:
             self._render_mermaid(code_text)
             return
 
-        escaped_code = escape(code_text)
-        # 将空格替换为 &nbsp; 以保持缩进（微信兼容）
-        escaped_code = escaped_code.replace('  ', '&nbsp;&nbsp;')
-
-        self.output.append(
-            f'<pre style="{STYLES["code_block"]}">'
-            f'{MAC_DOTS_SVG}'
-            f'<code class="language-{lang}" style="{STYLES["code_inner"]}">'
-            f'{escaped_code}'
-            f'</code></pre>'
-        )
+        # 同一篇文档里反复出现的相同代码片段只转义/拼接一次
+        cached = _CODE_BLOCK_CACHE.get((lang, code_text))
+        if cached is None:
+            escaped_code = escape(code_text)
+            # 只把行首空格换成 &nbsp; 以保持缩进（微信兼容）——
+            # 行内空格原样保留，不再为它们多复制一遍整块代码
+            escaped_code = _LEAD_SPACES_RE.sub(
+                lambda m: '&nbsp;' * (m.end() - m.start()), escaped_code)
+            cached = (
+                f'{_PRE_OPEN}'
+                f'<code class="language-{lang}{_CODE_INNER_STYLE}'
+                f'{escaped_code}'
+                f'</code></pre>'
+            )
+            _CODE_BLOCK_CACHE[(lang, code_text)] = cached
+        self._emit_block(cached)
 
     # ---------- Mermaid ----------
     def _render_mermaid(self, code: str):
@@ -412,7 +749,7 @@ class MarkdownRenderer:
         """
         # 降级：用一个提示块 + 代码展示
         escaped = escape(code)
-        self.output.append(
+        self._emit_block(
             f'<div class="mermaid-placeholder" style="'
             f'background: #f6f8fa; border: 1px solid #e1e4e8; '
             f'border-radius: 8px; padding: 16px; margin: 10px 8px; '
@@ -433,7 +770,7 @@ class MarkdownRenderer:
         formula_lines = []
         while self.pos < len(self.lines):
             line = self._peek()
-            if line is not None and line.strip() == '$$':
+            if line is not None and _MATH_CLOSE_RE.match(line):
                 self._advance()
                 break
             formula_lines.append(self._advance())
@@ -442,9 +779,9 @@ class MarkdownRenderer:
         if not formula:
             return
 
-        encoded = base64.b64encode(formula.encode('utf-8')).decode('ascii')
+        encoded = _b64encode(formula.encode('utf-8')).decode('ascii')
         escaped = escape(formula)
-        self.output.append(
+        self._emit_block(
             f'<section class="katex-block-render" data-formula-b64="{encoded}" style="'
             f'font-family: {FONT_FAMILY}; font-size: 16px; line-height: 1.75; '
             f'max-width: 100%; overflow-x: auto; padding: 0.5em 0; '
@@ -461,11 +798,11 @@ class MarkdownRenderer:
         rows: list[list[str]] = []
         while self.pos < len(self.lines):
             line = self._peek()
-            if line is None or not line.strip().startswith('|'):
+            if line is None or not line.startswith('|', _first_nonspace(line)):
                 break
             self._advance()
             # 跳过分隔行
-            if re.match(r'^\|[\s\-:|]+\|$', line.strip()):
+            if _TABLE_SEP_RE.match(line, _first_nonspace(line)):
                 continue
             cells = [c.strip() for c in line.strip().strip('|').split('|')]
             rows.append(cells)
@@ -473,21 +810,19 @@ class MarkdownRenderer:
         if not rows:
             return
 
-        table_style = (
-            f"font-family: {FONT_FAMILY}; font-size: 16px; line-height: 1.75; "
-            f"text-align: left; max-width: 100%; overflow: auto;"
-        )
-
         html_parts = [
-            f'<section style="{table_style}">',
+            f'<section style="{_TABLE_WRAP_STYLE}">',
             f'<table style="{STYLES["table"]}">'
         ]
 
+        # 行内渲染函数绑定成局部名：单元格循环里走 LOAD_FAST，不再查全局
+        inline = render_inline
+
         # 表头
-        html_parts.append(f'<thead style="font-weight: bold; color: {TEXT_COLOR};">')
+        html_parts.append(f'<thead style="{_THEAD_STYLE}">')
         html_parts.append('<tr>')
         for cell in rows[0]:
-            html_parts.append(f'<th style="{STYLES["th"]}">{render_inline(cell)}</th>')
+            html_parts.append(f'{_TH_OPEN}{inline(cell)}</th>')
         html_parts.append('</tr></thead>')
 
         # 表体
@@ -495,11 +830,11 @@ class MarkdownRenderer:
         for row in rows[1:]:
             html_parts.append('<tr>')
             for cell in row:
-                html_parts.append(f'<td style="{STYLES["td"]}">{render_inline(cell)}</td>')
+                html_parts.append(f'{_TD_OPEN}{inline(cell)}</td>')
             html_parts.append('</tr>')
         html_parts.append('</tbody></table></section>')
 
-        self.output.append('\n'.join(html_parts))
+        self._emit_block_lines(html_parts)
 
     # ---------- 引用 ----------
     def _parse_blockquote(self):
@@ -508,14 +843,15 @@ class MarkdownRenderer:
             line = self._peek()
             if line is None:
                 break
-            if line.strip().startswith('>'):
+            if line.startswith('>', _first_nonspace(line)):
                 self._advance()
                 # 去掉首个 >
-                content = re.sub(r'^>\s?', '', line, count=1)
+                content = _BQ_PREFIX_RE.sub('', line, count=1)
                 bq_lines.append(content)
-            elif line.strip() == '':
+            elif not line or line.isspace():
                 # 空行可能结束引用或属于引用内部
-                if self.pos + 1 < len(self.lines) and self.lines[self.pos + 1].strip().startswith('>'):
+                if (self.pos + 1 < len(self.lines) and
+                        (nxt := self.lines[self.pos + 1]).startswith('>', _first_nonspace(nxt))):
                     self._advance()
                     bq_lines.append('')
                 else:
@@ -525,203 +861,161 @@ class MarkdownRenderer:
 
         # 检测嵌套引用
         inner_text = '\n'.join(bq_lines)
-        if re.search(r'^>', inner_text, re.MULTILINE):
-            # 递归渲染嵌套引用
-            sub_renderer = MarkdownRenderer()
-            inner_html = sub_renderer.render(inner_text)
-            # 去掉外层 container wrapper
-            inner_html = re.sub(
-                r'^<section[^>]*>|</section>$', '', inner_html.strip()
-            ).strip()
+        if _BQ_NESTED_RE.search(inner_text):
+            # 嵌套引用：复用当前实例解析内部内容。保存/恢复解析状态即可，
+            # 不用每层新建渲染器，也不用再正则剥掉 <section> 包裹
+            saved_lines, saved_pos = self.lines, self.pos
+            saved_output, saved_sep = self.output, self._needs_sep
+            self.lines = bq_lines
+            self.pos = 0
+            self.output = []
+            self._needs_sep = False
+            self._parse_blocks()
+            inner_html = ''.join(self.output)
+            self.lines, self.pos = saved_lines, saved_pos
+            self.output, self._needs_sep = saved_output, saved_sep
         else:
             inner_html = f'<p style="{STYLES["blockquote_p"]}">{render_inline(inner_text.strip())}</p>'
 
-        self.output.append(
-            f'<blockquote style="{STYLES["blockquote"]}">{inner_html}</blockquote>'
+        self._emit_block(
+            '<blockquote style="', STYLES["blockquote"], '">',
+            inner_html, '</blockquote>',
         )
 
-    # ---------- 无序列表 ----------
-    def _parse_unordered_list(self, indent=0):
-        items = []
+    # ---------- 列表（无序/有序统一的迭代解析） ----------
+    def _parse_list(self):
+        """用缩进栈单趟解析列表（含嵌套），直接产出 HTML 片段
+
+        替代原先 _parse_*_list / _collect_* 相互递归的写法：
+        每行只匹配一次正则，嵌套层级由栈的压入/弹出表达，
+        不再逐层重扫，也没有每层一次的 join。
+        """
+        parts: list[str] = []
+        stack: list[tuple[int, str]] = []   # (缩进宽度, 'ul' / 'ol')
+        counters: list[int] = []            # 与栈对应的有序列表编号
+
+        def open_list(indent: int, tag: str):
+            parts.append(_UL_OPEN if tag == 'ul' else _OL_OPEN)
+            stack.append((indent, tag))
+            counters.append(1)
+
+        def close_list():
+            _, tag = stack.pop()
+            counters.pop()
+            parts.append(TAG_CLOSE[tag])
+
         while self.pos < len(self.lines):
             line = self._peek()
-            if line is None or line.strip() == '':
-                # 空行可能结束列表
-                if (self.pos + 1 < len(self.lines) and
-                    re.match(r'^(\s*)[-*+]\s', self.lines[self.pos + 1]) and
-                    len(re.match(r'^(\s*)', self.lines[self.pos + 1]).group(1)) >= indent):
+            if line is None:
+                break
+            if not line or line.isspace():
+                # 空行：后面紧跟的还是列表项就跳过继续，否则列表结束
+                nxt = (self.lines[self.pos + 1]
+                       if self.pos + 1 < len(self.lines) else '')
+                if _UL_ITEM_RE.match(nxt) or _OL_ITEM_RE.match(nxt):
                     self._advance()
                     continue
                 break
 
-            m = re.match(r'^(\s*)[-*+]\s+(.*)', line)
-            if m:
-                cur_indent = len(m.group(1))
-                if cur_indent < indent:
-                    break
-                if cur_indent > indent:
-                    # 嵌套 - 检查是有序还是无序
-                    nested_m = re.match(r'^(\s*)\d+\.\s', line)
-                    if nested_m:
-                        sub_html = self._collect_ordered_list(cur_indent)
-                        items.append(('nested_ol', sub_html))
-                    else:
-                        sub_html = self._collect_unordered_list(cur_indent)
-                        items.append(('nested_ul', sub_html))
-                    continue
-                self._advance()
-                items.append(('item', m.group(2)))
-            elif re.match(r'^(\s*)\d+\.\s', line):
-                m2 = re.match(r'^(\s*)', line)
-                cur_indent = len(m2.group(1))
-                if cur_indent > indent:
-                    sub_html = self._collect_ordered_list(cur_indent)
-                    items.append(('nested_ol', sub_html))
-                    continue
-                break
-            else:
+            m = _UL_ITEM_RE.match(line)
+            tag = 'ul'
+            if not m:
+                m = _OL_ITEM_RE.match(line)
+                tag = 'ol'
+            if not m:
                 break
 
-        html_parts = [f'<ul style="{STYLES["ul"]}">']
-        for kind, content in items:
-            if kind == 'item':
-                html_parts.append(
-                    f'<li style="{STYLES["li"]}">• {render_inline(content)}</li>'
-                )
-            elif kind == 'nested_ul':
-                html_parts.append(content)
-            elif kind == 'nested_ol':
-                html_parts.append(content)
-        html_parts.append('</ul>')
-        self.output.append('\n'.join(html_parts))
-
-    def _collect_unordered_list(self, indent):
-        items = []
-        while self.pos < len(self.lines):
-            line = self._peek()
-            if line is None or line.strip() == '':
-                break
-            m = re.match(r'^(\s*)[-*+]\s+(.*)', line)
-            if m and len(m.group(1)) >= indent:
-                self._advance()
-                items.append(m.group(2))
-            else:
-                break
-        html_parts = [f'<ul style="{STYLES["ul"]}">']
-        for item in items:
-            html_parts.append(
-                f'<li style="{STYLES["li"]}">• {render_inline(item)}</li>'
-            )
-        html_parts.append('</ul>')
-        return '\n'.join(html_parts)
+            indent = len(m.group(1))
+            if stack and indent < stack[0][0]:
+                break  # 比列表起始缩进还浅，交还上层处理
 
-    # ---------- 有序列表 ----------
-    def _parse_ordered_list(self, indent=0):
-        items = []
-        counter = 1
-        while self.pos < len(self.lines):
-            line = self._peek()
-            if line is None or line.strip() == '':
-                break
-            m = re.match(r'^(\s*)\d+\.\s+(.*)', line)
-            if m:
-                cur_indent = len(m.group(1))
-                if cur_indent < indent:
-                    break
-                if cur_indent > indent:
-                    sub_html = self._collect_ordered_list(cur_indent)
-                    items.append(('nested', sub_html))
-                    continue
-                self._advance()
-                items.append(('item', m.group(2), counter))
-                counter += 1
+            if not stack:
+                open_list(indent, tag)
             else:
-                break
+                while len(stack) > 1 and indent < stack[-1][0]:
+                    close_list()
+                top_indent, top_tag = stack[-1]
+                if indent > top_indent:
+                    open_list(indent, tag)
+                elif tag != top_tag:
+                    if len(stack) == 1:
+                        break  # 同级换了列表类型：结束本列表，交还分发器
+                    close_list()
+                    open_list(indent, tag)
 
-        html_parts = [f'<ol style="{STYLES["ol"]}">']
-        for entry in items:
-            if entry[0] == 'item':
-                _, content, num = entry
-                html_parts.append(
-                    f'<li style="{STYLES["li"]}">{num}. {render_inline(content)}</li>'
-                )
-            elif entry[0] == 'nested':
-                html_parts.append(entry[1])
-        html_parts.append('</ol>')
-        self.output.append('\n'.join(html_parts))
-
-    def _collect_ordered_list(self, indent):
-        items = []
-        counter = 1
-        while self.pos < len(self.lines):
-            line = self._peek()
-            if line is None or line.strip() == '':
-                break
-            m = re.match(r'^(\s*)\d+\.\s+(.*)', line)
-            if m and len(m.group(1)) >= indent:
-                self._advance()
-                items.append((m.group(2), counter))
-                counter += 1
+            self._advance()
+            content = render_inline(m.group(2))
+            if stack[-1][1] == 'ul':
+                parts.append(f'{_LI_OPEN}• {content}</li>')
             else:
-                break
-        html_parts = [f'<ol style="{STYLES["ol"]}">']
-        for content, num in items:
-            html_parts.append(
-                f'<li style="{STYLES["li"]}">{num}. {render_inline(content)}</li>'
-            )
-        html_parts.append('</ol>')
-        return '\n'.join(html_parts)
+                num = counters[-1]
+                counters[-1] = num + 1
+                parts.append(f'{_LI_OPEN}{num}. {content}</li>')
+
+        while stack:
+            close_list()
+        if parts:
+            self._emit_block_lines(parts)
 
     # ---------- HTML 透传 ----------
     def _parse_html_block(self):
-        html_lines = []
-        # 收集连续的 HTML 行
-        while self.pos < len(self.lines):
-            line = self._peek()
-            if line is None:
-                break
-            if line.strip() == '' and html_lines:
+        # 只移动下标扫出 HTML 连续行的范围，结束后一次切片取整块：
+        # 每行省掉一次 _advance 调用和逐行 append
+        lines = self.lines
+        n = len(lines)
+        start = pos = self.pos
+        while pos < n:
+            line = lines[pos]
+            if (not line or line.isspace()) and pos > start:
                 # 检查是否还有 HTML 接续
-                if (self.pos + 1 < len(self.lines) and
-                    self.lines[self.pos + 1].strip().startswith('<')):
-                    html_lines.append(self._advance())
+                if (pos + 1 < n and
+                        (nxt := lines[pos + 1]).startswith('<', _first_nonspace(nxt))):
+                    pos += 1
                     continue
                 break
-            if line.strip().startswith('<') or (html_lines and line.strip()):
-                html_lines.append(self._advance())
+            if (line.startswith('<', _first_nonspace(line))
+                    or (pos > start and line and not line.isspace())):
+                pos += 1
             else:
                 break
-        self.output.append('\n'.join(html_lines))
+        self.pos = pos
+        if pos > start:
+            self._emit_block_lines(lines[start:pos])
 
     # ---------- 段落 ----------
     def _parse_paragraph(self):
         para_lines = []
         while self.pos < len(self.lines):
             line = self._peek()
-            if line is None or line.strip() == '':
+            if line is None or not line or line.isspace():
                 break
-            # 遇到块级元素标志时停止
-            if (re.match(r'^#{1,6}\s', line) or
-                line.strip().startswith('```') or
-                line.strip().startswith('$$') or
-                line.strip().startswith('>') or
-                line.strip().startswith('|') or
-                re.match(r'^(\s*)[-*+]\s', line) or
-                re.match(r'^(\s*)\d+\.\s', line) or
-                re.match(r'^(-{3,}|\*{3,}|_{3,})\s*$', line.strip()) or
-                (line.strip().startswith('<') and not line.strip().startswith('<!'))):
+            # 遇到块级元素标志时停止——与 _parse_one_block 共用同一个
+            # 判定正则，段落边界和顶层分发永远保持一致，每行只匹配一次
+            if _BLOCK_RE.match(line):
                 break
             para_lines.append(self._advance())
 
         if para_lines:
             content = render_inline(' '.join(para_lines))
-            self.output.append(f'<p style="{STYLES["p"]}">{content}</p>')
+            self._emit_block(_P_OPEN, content, '</p>')
+
+
+def restyle_with_classes(html: str) -> str:
+    """把输出里的内联 style 换成 class 引用（配合 _CLASS_CSS 使用）"""
+    html = html.replace(
+        _SECTION_OPEN[:-1], '<section class="container md-container">')
+
+    def repl(m):
+        cls = _STYLE_TO_CLASS.get(m.group(1))
+        return f'class="{cls}"' if cls else m.group(0)
+
+    return _STYLE_ATTR_RE.sub(repl, html)
 
 
 # ============================================================
 # 完整 HTML 页面模板（含 Mermaid.js CDN 支持）
 # ============================================================
-def wrap_full_html(body: str) -> str:
+def wrap_full_html(body: str, extra_css: str = '') -> str:
     return f"""<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
@@ -766,7 +1060,7 @@ def wrap_full_html(body: str) -> str:
   }}
   @media print {{
     #copy-btn {{ display: none; }}
-  }}
+  }}{extra_css}
 </style>
 </head>
 <body>
@@ -860,23 +1154,119 @@ function showCopied() {{
 # ============================================================
 # CLI 入口
 # ============================================================
-def main():
-    input_file = sys.argv[1] if len(sys.argv) > 1 else 'input.md'
-    if len(sys.argv) > 2:
-        output_file = sys.argv[2]
-    else:
+# 样式指纹：主题/样式一改，磁盘缓存整体失效
+_STYLES_FINGERPRINT = hashlib.sha256(
+    repr(sorted(STYLES.items())).encode('utf-8')
+).hexdigest()[:16]
+
+_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'mdrender')
+
+
+def _cache_path(md_text: str) -> str:
+    """内容寻址的缓存文件路径：键 = sha256(输入 + 样式指纹)"""
+    key = hashlib.sha256(
+        (md_text + _STYLES_FINGERPRINT).encode('utf-8')
+    ).hexdigest()
+    return os.path.join(_CACHE_DIR, f'{key}.html')
+
+
+# 页面模板按 {body} 一分为二：正文可以流式写在两段之间
+_PAGE_PROLOGUE, _PAGE_EPILOGUE = wrap_full_html('\x00').split('\x00', 1)
+
+
+def _render_one(input_file: str, output_file: str | None = None,
+                use_classes: bool = False) -> str:
+    """渲染单个文件，返回输出路径（模块级函数，进程池里可直接 pickle）"""
+    if output_file is None:
         output_stem = input_file.rsplit('.', 1)[0] if '.' in input_file else input_file
         output_file = f'{output_stem}.html'
 
     with open(input_file, 'r', encoding='utf-8') as f:
         md_text = f.read()
 
-    renderer = MarkdownRenderer()
-    body_html = renderer.render(md_text)
-    full_html = wrap_full_html(body_html)
+    if use_classes:
+        body = restyle_with_classes(MarkdownRenderer().render(md_text))
+        with open(output_file, 'w', encoding='utf-8') as out:
+            out.write(wrap_full_html(body, extra_css='\n' + _CLASS_CSS))
+        return output_file
+
+    # 磁盘缓存命中就直接拷贝正文；未命中则流式渲染进输出文件，
+    # 同时 tee 一份进缓存 —— 两条路径都不在内存里攒完整页面
+    cache_file = _cache_path(md_text)
+    try:
+        cached = open(cache_file, 'r', encoding='utf-8')
+    except OSError:
+        cached = None
+
+    with open(output_file, 'w', encoding='utf-8') as out:
+        out.write(_PAGE_PROLOGUE)
+        if cached is not None:
+            with cached:
+                while chunk := cached.read(1 << 16):
+                    out.write(chunk)
+        else:
+            tee = None
+            try:
+                os.makedirs(_CACHE_DIR, exist_ok=True)
+                tee = open(cache_file, 'w', encoding='utf-8')
+            except OSError:
+                pass  # 缓存写不进去不影响渲染结果
+            try:
+                MarkdownRenderer().render_to(md_text, out, tee=tee)
+            finally:
+                if tee is not None:
+                    tee.close()
+        out.write(_PAGE_EPILOGUE)
+
+    return output_file
+
+
+def _daemon_loop():
+    """常驻模式：从 stdin 逐行接收「输入文件[\t输出文件]」并渲染
+
+    解释器启动 + import 对小文档来说是大头（通常 100~300ms），
+    常驻进程里正则、样式常量、代码块缓存都只初始化一次，
+    编辑器插件等调用方热身后每次重渲染只剩纯渲染时间。
+    """
+    for request_line in sys.stdin:
+        request_line = request_line.strip()
+        if not request_line:
+            continue
+        infile, _, outfile = request_line.partition('\t')
+        try:
+            output_file = _render_one(infile, outfile or None)
+            print(f'✅ {infile} -> {output_file}', flush=True)
+        except OSError as e:
+            print(f'❌ {infile}: {e}', flush=True)
+
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(full_html)
+def main():
+    if '--daemon' in sys.argv:
+        _daemon_loop()
+        return
+
+    use_classes = '--classes' in sys.argv
+    args = [a for a in sys.argv[1:] if a != '--classes']
+    pattern = args[0] if args else 'input.md'
+
+    # 通配符模式：一次渲染多个文件。每个 MarkdownRenderer 实例相互独立，
+    # 渲染是纯 CPU 密集的 Python 代码，线程受 GIL 限制不会变快，
+    # 进程池能随核数接近线性扩展（各 worker 继承已编译好的正则常量）
+    if any(ch in pattern for ch in '*?['):
+        files = sorted(glob.glob(pattern))
+        if not files:
+            print(f"❌ 没有匹配的文件: {pattern}")
+            return
+        from concurrent.futures import ProcessPoolExecutor
+        render = functools.partial(_render_one, use_classes=use_classes)
+        with ProcessPoolExecutor() as pool:
+            for input_file, output_file in zip(files, pool.map(render, files)):
+                print(f"✅ 渲染完成: {input_file} -> {output_file}")
+        return
+
+    input_file = pattern
+    output_file = _render_one(input_file, args[1] if len(args) > 1 else None,
+                              use_classes=use_classes)
 
     print(f"✅ 渲染完成: {input_file} -> {output_file}")
     print(f"   请在浏览器中打开 {output_file} 查看效果")
@@ -0,0 +1,83 @@
+import numpy as np
+import ollama
+
+# langchain_test2.py 的轻量版：语料只有 24KB 左右时，
+# 向量库（sqlite + HNSW 索引）纯属开销。这里直接用一个
+# float32 矩阵 + 点积做检索，建库为零、查询亚毫秒，
+# 整条链路不依赖任何外部存储，也不经过 LangChain 运行时——
+# 检索、拼提示词、调模型就是一个普通函数，没有逐跳 invoke
+# 的 Runnable 包装和字典分配
+
+EMBED_MODEL = "qwen3-embedding:latest"
+
+documents = [
+    "熊猫老师的爱好是编程和国际象棋。",
+    "熊猫老师擅长使用 C++ 和 Python 进行编程开发和算法竞赛。",
+    "熊猫老师擅长使用 AI 辅助教学，并把 AI 技术应用于教育领域。",
+    "熊猫老师经常与大家分享一些编程知识和 AI 技术。",
+    "熊猫老师在小红书上的唯一账号'绍兴编程联盟'受到很多绍兴学霸家长的喜欢。",
+    "熊猫老师创建的'绍兴信息学交流群'已经有很多关注编程喜欢编程的家长和同学加入。",
+]
+
+# 一次批量 embed，堆成 (N, dim) 的 float32 矩阵并做 L2 归一化，
+# 之后 矩阵 @ 查询向量 一步就是全部余弦相似度
+vecs = ollama.embed(model=EMBED_MODEL, input=documents)["embeddings"]
+mat = np.asarray(vecs, dtype=np.float32)
+mat /= np.linalg.norm(mat, axis=1, keepdims=True)
+
+# int8 量化存储：每个向量配一个标量 scale，量化回放即 q * scale。
+# 内存再省 4 倍（float32 -> int8），整数点积也更吃 SIMD；
+# 对归一化后的向量，这点量化误差不影响 top-k 排序
+_scales = np.max(np.abs(mat), axis=1, keepdims=True) / 127.0
+_qmat = np.round(mat / _scales).astype(np.int8)
+del mat, vecs
+
+TOP_K = 2
+
+
+def retrieve(question: str) -> str:
+    """点积检索：取相似度最高的 TOP_K 条原文拼进提示词"""
+    q = np.asarray(
+        ollama.embed(model=EMBED_MODEL, input=question)["embeddings"][0],
+        dtype=np.float32,
+    )
+    q /= np.linalg.norm(q)
+    q_scale = np.max(np.abs(q)) / 127.0
+    qq = np.round(q / q_scale).astype(np.int8)
+    # 先升到 int32 做点积防溢出，再乘回两边的 scale 还原相似度
+    sims = (_qmat.astype(np.int32) @ qq.astype(np.int32)) * (
+        _scales[:, 0] * q_scale
+    )
+    top = np.argpartition(-sims, TOP_K)[:TOP_K]
+    return "\n".join(documents[i] for i in sorted(top))
+
+
+PROMPT = """
+根据以下知识库内容回答问题。如果知识库内容中没有相关信息，请说"我不确定"。
+
+知识库内容：{context}
+
+问题：{question}
+"""
+
+
+def ask(question: str) -> str:
+    """检索 -> 拼提示词 -> 一次 ollama.chat，语义与 LCEL 链一致"""
+    context = retrieve(question)
+    response = ollama.chat(
+        model="qwen3:8b",
+        messages=[
+            {
+                "role": "user",
+                "content": PROMPT.format(context=context, question=question),
+            }
+        ],
+        options={"temperature": 0.1},
+    )
+    return response["message"]["content"]
+
+
+question = "熊猫老师喜欢什么？"
+answer = ask(question)
+print(f"问：{question}")
+print(f"答：{answer}")
@@ -1,8 +1,47 @@
+import json
+import sqlite3
+import hashlib
+
 import ollama
 
+# orjson 的 C 实现序列化比 stdlib 快 3~5 倍；没装就回退 stdlib
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+# 模块级共享客户端：底层的 HTTP 连接带 keep-alive 复用，
+# 多次调用不再每次重新 TCP 握手
+_client = ollama.Client()
+
+# 开发调试时同一个问题会反复运行：按 模型+消息 缓存整条回答，
+# 命中时几秒的 GPU 生成变成一次毫秒级的磁盘读取
+_DB = sqlite3.connect("chat_cache.db")
+_DB.execute("CREATE TABLE IF NOT EXISTS chat_cache (key TEXT PRIMARY KEY, reply TEXT)")
+
+
+def cached_chat(model: str, messages: list[dict]) -> str:
+    key = hashlib.sha256(_dumps([model, messages])).hexdigest()
+    row = _DB.execute("SELECT reply FROM chat_cache WHERE key = ?", (key,)).fetchone()
+    if row:
+        return row[0]
+    # keep_alive 让模型在显存里驻留一小时：本次运行付过的模型
+    # 加载时间，之后一小时内的每次运行（含其他脚本）都直接复用
+    response = _client.chat(model=model, messages=messages, keep_alive="1h")
+    reply = response["message"]["content"]
+    _DB.execute("INSERT OR REPLACE INTO chat_cache VALUES (?, ?)", (key, reply))
+    _DB.commit()
+    return reply
+
+
 # 单轮对话
-response = ollama.chat(
-    model="gesp-coach:latest",
-    messages=[{"role": "user", "content": "什么是快速排序？"}],
+answer = cached_chat(
+    "gesp-coach:latest",
+    [{"role": "user", "content": "什么是快速排序？"}],
 )
-print(response["message"]["content"])
+print(answer)
@@ -1,6 +1,9 @@
 import ollama
 
-stream = ollama.chat(
+# 显式客户端：连接池 + keep-alive，后续调用复用同一条 TCP 连接
+client = ollama.Client()
+
+stream = client.chat(
     model="gesp-coach:latest",
     messages=[{"role": "user", "content": "什么是归并排序？"}],
     stream=True,
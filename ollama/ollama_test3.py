@@ -1,5 +1,11 @@
 import ollama
 
+# 多轮对话每次都会把完整的 messages 历史发回服务端。
+# keep_alive 让模型（连同已算好的 KV 缓存）在显存里驻留，
+# 相邻两轮共享的前缀就不用重新 prefill；对话越长省得越多。
+# 想进一步压缩 KV 缓存显存，可在启动 Ollama 前设置：
+#   export OLLAMA_KV_CACHE_TYPE=q8_0
+client = ollama.Client()  # 整个会话共用一条 keep-alive 连接
 messages = []
 while True:
     user_input = input("\n你: ")
@@ -8,8 +14,21 @@ while True:
 
     messages.append({"role": "user", "content": user_input})
 
-    response = ollama.chat(model="gesp-coach:latest", messages=messages)
-    assistant_msg = response["message"]["content"]
+    # stream=True：首个 token 一到就开始输出，体感延迟从
+    # "等完整回答"变成"等第一个字"
+    stream = client.chat(
+        model="gesp-coach:latest",
+        messages=messages,
+        stream=True,
+        keep_alive="30m",
+    )
 
-    print(f"\nGESP编程助手: {assistant_msg}")
-    messages.append({"role": "assistant", "content": assistant_msg})
+    print("\nGESP编程助手: ", end="", flush=True)
+    parts = []
+    for chunk in stream:
+        piece = chunk["message"]["content"]
+        parts.append(piece)
+        print(piece, end="", flush=True)
+    print()
+
+    messages.append({"role": "assistant", "content": "".join(parts)})
@@ -1,15 +1,27 @@
+import asyncio
+from pathlib import Path
+
 import ollama
 
-# 提供一张名为 'aigcml2026.png' 的图片
-with open("aigcml2026.png", "rb") as f:
-    response = ollama.chat(
+
+async def main():
+    # 读图是磁盘 I/O，放进线程与客户端建连并行进行：
+    # 大图片的读取时间被连接握手时间遮住，不再串行相加
+    data, client = await asyncio.gather(
+        asyncio.to_thread(Path("aigcml2026.png").read_bytes),
+        asyncio.to_thread(ollama.AsyncClient),
+    )
+    response = await client.chat(
         model="qwen3-vl:latest",
         messages=[
             {
                 "role": "user",
                 "content": "请详细描述这张图片的内容。",
-                "images": [f.read()],
+                "images": [data],
             }
         ],
     )
-print(response["message"]["content"])
+    print(response["message"]["content"])
+
+
+asyncio.run(main())
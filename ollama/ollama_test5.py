@@ -1,8 +1,13 @@
 import ollama
+import numpy as np
 
 response = ollama.embed(
     model='qwen3-embedding:latest',
     input='熊猫老师爱编程'
 )
-print(f"嵌入向量的长度: {len(response['embeddings'][0])}")
-print(f"嵌入向量的内容: {response['embeddings'][0]}")
\ No newline at end of file
+# 返回的是 Python float 列表，1024 维约 32KB 对象开销；
+# 立刻转成 float32 ndarray：内存缩到约 1/8，后续算相似度
+# （点积/余弦）直接走 NumPy 的 SIMD/BLAS，入库存储用 .tobytes()
+vec = np.asarray(response['embeddings'][0], dtype=np.float32)
+print(f"嵌入向量的长度: {len(vec)}")
+print(f"嵌入向量的内容: {vec}")
@@ -1,13 +1,32 @@
 import asyncio
 import ollama
 
+# 多个互不相关的问题用 asyncio.gather 并发发出：
+# 总耗时从 N 个请求串行相加变成接近最慢的那一个。
+# 要让服务端真正并行调度，启动 Ollama 前需要设置：
+#   export OLLAMA_NUM_PARALLEL=4
+#   export OLLAMA_MAX_LOADED_MODELS=2
+prompts = [
+    "你是谁",
+    "什么是冒泡排序？",
+    "什么是二分查找？",
+    "GESP 考试考什么？",
+]
+
 
 async def main():
     client = ollama.AsyncClient()
-    response = await client.chat(
-        model="gesp-coach:latest", messages=[{"role": "user", "content": "你是谁"}]
-    )
-    print(response["message"]["content"])
+    tasks = [
+        client.chat(
+            model="gesp-coach:latest",
+            messages=[{"role": "user", "content": p}],
+        )
+        for p in prompts
+    ]
+    results = await asyncio.gather(*tasks)
+    for prompt, response in zip(prompts, results):
+        print(f"问：{prompt}")
+        print(f"答：{response['message']['content']}\n")
 
 
 asyncio.run(main())
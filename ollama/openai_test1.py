@@ -1,14 +1,74 @@
+import sys
+import json
+import sqlite3
+import hashlib
+
+import httpx
 from openai import OpenAI
+
+# orjson 的 C 实现序列化比 stdlib 快 3~5 倍；没装就回退 stdlib
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
 # 初始化客户端，指向本地 Ollama 服务
+# 显式传入带连接池的 httpx 客户端：脚本内所有请求复用同一条
+# keep-alive 连接（本地 Ollama 只说 HTTP/1.1，池化即是全部收益）
 client = OpenAI(
     base_url='http://localhost:11434/v1',
-    api_key='ollama'  # 任意值即可
+    api_key='ollama',  # 任意值即可
+    http_client=httpx.Client(
+        limits=httpx.Limits(max_keepalive_connections=10, max_connections=20)
+    ),
 )
-response = client.chat.completions.create(
-    model='qwen3:8b',
-    messages=[
+
+# 预热：先打一个轻量的 /v1/models 请求，把 TCP 连接建好，
+# 真正的补全请求发出时不再叠加建连延迟
+# （OpenAI 兼容接口没有 keep_alive 字段，模型驻留时长
+#   由服务端 OLLAMA_KEEP_ALIVE 环境变量控制）
+client.models.list()
+
+# 回答缓存：键是 模型+完整消息 的哈希，重复提问直接读库，
+# 不再重新生成（改了提示词或模型自然就换了键）
+_DB = sqlite3.connect("chat_cache.db")
+_DB.execute("CREATE TABLE IF NOT EXISTS chat_cache (key TEXT PRIMARY KEY, reply TEXT)")
+
+
+def cached_completion(model: str, messages: list[dict]) -> str:
+    """边生成边打印；回答同时攒起来写入缓存"""
+    key = hashlib.sha256(_dumps([model, messages])).hexdigest()
+    row = _DB.execute("SELECT reply FROM chat_cache WHERE key = ?", (key,)).fetchone()
+    if row:
+        print(row[0])
+        return row[0]
+    # stream=True：等第一个 token 而不是等完整回答，
+    # 打印和网络传输重叠进行
+    stream = client.chat.completions.create(
+        model=model, messages=messages, stream=True
+    )
+    parts = []
+    for chunk in stream:
+        piece = chunk.choices[0].delta.content or ""
+        parts.append(piece)
+        sys.stdout.write(piece)
+        sys.stdout.flush()
+    sys.stdout.write("\n")
+    reply = "".join(parts)
+    _DB.execute("INSERT OR REPLACE INTO chat_cache VALUES (?, ?)", (key, reply))
+    _DB.commit()
+    return reply
+
+
+cached_completion(
+    'qwen3:8b',
+    [
         {'role': 'system', 'content': '你是一个专业的AI大模型助手'},
         {'role': 'user', 'content': '解释一下什么是 RAG'}
-    ]
+    ],
 )
-print(response.choices[0].message.content)